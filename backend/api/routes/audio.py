@@ -2,56 +2,166 @@
 Audio download API routes
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import ORJSONResponse
+from typing import Any, Dict, Optional
+from dataclasses import dataclass, asdict
+from pathlib import Path
 import os
+import asyncio
 import logging
 
-from core.models import AudioDownloadRequest, MusicDownloadRequest, SponsorBlockMusicRequest, DownloadResponse, URLRequest
+from core.models import AudioDownloadRequest, SponsorBlockMusicRequest, DownloadResponse, URLRequest, BatchURLRequest
 from core.downloader import downloader
-from services.queue_manager import queue_manager
+from core.responses import StaticJSON
+from services.queue_manager import queue_manager, AudioJob
+from services import metadata
 from core.config import settings
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 logger = logging.getLogger(__name__)
 
+# Bound concurrent yt-dlp probes from batch extraction
+_extract_semaphore = asyncio.Semaphore(8)
+
+# yt-dlp options shared by every audio extraction request
+_DEFAULT_AUDIO_OUTTMPL = os.path.join(settings.DOWNLOAD_DIR, '%(title).100s.%(ext)s')
+_AUDIO_OPTIONS_BASE = {
+    'format': 'bestaudio/best',
+    'restrictfilenames': True,
+    'windowsfilenames': True,
+}
+
+def _build_audio_options(audio_format: str, quality: str, output_template: Optional[str] = None) -> Dict[str, Any]:
+    """Build yt-dlp options for audio extraction from the shared template"""
+    options = _AUDIO_OPTIONS_BASE.copy()
+    options['postprocessors'] = [{
+        'key': 'FFmpegExtractAudio',
+        'preferredcodec': audio_format,
+        'preferredquality': quality if quality != 'best' else '320',
+    }]
+    options['outtmpl'] = output_template or _DEFAULT_AUDIO_OUTTMPL
+    return options
+
+# SponsorBlock categories, built once and exposed with attribute access
+@dataclass(frozen=True, slots=True)
+class SponsorBlockCategory:
+    name: str
+    description: str
+    color: str
+    recommended_for_music: bool
+
+SPONSORBLOCK_CATEGORY_TABLE: Dict[str, SponsorBlockCategory] = {
+    "sponsor": SponsorBlockCategory(
+        name="Sponsor",
+        description="Paid promotion, paid referrals and direct advertisements",
+        color="#00d400",
+        recommended_for_music=True
+    ),
+    "intro": SponsorBlockCategory(
+        name="Intermission/Intro Animation",
+        description="An interval without actual content. Could be a pause, static frame, repeating animation",
+        color="#00ffff",
+        recommended_for_music=True
+    ),
+    "outro": SponsorBlockCategory(
+        name="Endcards/Credits",
+        description="Information that appears on screen after the main content",
+        color="#0202ed",
+        recommended_for_music=True
+    ),
+    "selfpromo": SponsorBlockCategory(
+        name="Unpaid/Self Promotion",
+        description="Self promotion: unpaid, charity, community, etc.",
+        color="#ffff00",
+        recommended_for_music=True
+    ),
+    "preview": SponsorBlockCategory(
+        name="Preview/Recap",
+        description="Quick recap of the previous video, or a preview of what's coming up",
+        color="#008fd6",
+        recommended_for_music=False
+    ),
+    "filler": SponsorBlockCategory(
+        name="Filler Tangent/Jokes",
+        description="Tangential scenes added only for filler or humor that are not required",
+        color="#7300ff",
+        recommended_for_music=False
+    ),
+    "interaction": SponsorBlockCategory(
+        name="Interaction Reminder",
+        description="When there is a short reminder to like, subscribe or interact",
+        color="#cc00ff",
+        recommended_for_music=True
+    ),
+    "music_offtopic": SponsorBlockCategory(
+        name="Non-Music Section",
+        description="Only for music videos. This includes introductions or outros in music videos",
+        color="#ff9900",
+        recommended_for_music=True
+    )
+}
+
+# Static payloads, serialized once at import
+SPONSORBLOCK_CATEGORIES = StaticJSON({
+    "categories": {key: asdict(category) for key, category in SPONSORBLOCK_CATEGORY_TABLE.items()},
+    "presets": {
+        "music_clean": {
+            "name": "Clean Music",
+            "description": "Perfect for music downloads - removes all non-music content",
+            "remove": ["sponsor", "intro", "outro", "selfpromo", "interaction", "music_offtopic"],
+            "mark": []
+        },
+        "music_minimal": {
+            "name": "Minimal Cleaning",
+            "description": "Only removes obvious promotions and sponsors",
+            "remove": ["sponsor", "selfpromo"],
+            "mark": []
+        },
+        "music_aggressive": {
+            "name": "Aggressive Cleaning",
+            "description": "Removes everything except the core music content",
+            "remove": ["sponsor", "intro", "outro", "selfpromo", "preview", "interaction", "music_offtopic"],
+            "mark": []
+        }
+    }
+}, max_age=31536000, immutable=True)
+
+AUDIO_QUALITY_PRESETS = StaticJSON({
+    "qualities": [
+        {"value": "best", "label": "Best Available", "description": "Highest quality available"},
+        {"value": "320", "label": "320 kbps", "description": "High quality MP3"},
+        {"value": "256", "label": "256 kbps", "description": "Good quality"},
+        {"value": "192", "label": "192 kbps", "description": "Standard quality"},
+        {"value": "128", "label": "128 kbps", "description": "Lower quality, smaller file"}
+    ],
+    "formats": [
+        {"value": "mp3", "label": "MP3", "description": "Most compatible format"},
+        {"value": "aac", "label": "AAC", "description": "Good quality, smaller files"},
+        {"value": "flac", "label": "FLAC", "description": "Lossless compression"},
+        {"value": "opus", "label": "Opus", "description": "Modern, efficient codec"},
+        {"value": "wav", "label": "WAV", "description": "Uncompressed audio"}
+    ]
+}, max_age=31536000, immutable=True)
+
 @router.post("/download", response_model=DownloadResponse)
 async def download_audio(request: AudioDownloadRequest):
     """Download audio with specified quality and format"""
     try:
         # Prepare download options for audio extraction
-        options = {
-            'format': 'bestaudio/best',
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': request.format,
-                'preferredquality': request.quality if request.quality != 'best' else '320',
-            }],
-            'outtmpl': request.output_template or os.path.join(
-                settings.DOWNLOAD_DIR, 
-                '%(title).100s.%(ext)s'
-            ),
-            'restrictfilenames': True,
-            'windowsfilenames': True,
-        }
+        options = _build_audio_options(request.format, request.quality, request.output_template)
         
         # Add to queue
-        download_request = {
-            'type': 'audio',
-            'url': str(request.url),
-            'options': options,
-            'priority': 1
-        }
+        job = AudioJob(url=request.url_str, options=options, priority=1)
+        download_id = await queue_manager.add_to_queue(job)
         
-        download_id = await queue_manager.add_to_queue(download_request)
-        
-        return DownloadResponse(
-            download_id=download_id,
-            status="pending",
-            message="Audio download added to queue"
+        # Fixed-shape reply; returning a Response skips DownloadResponse validation on the enqueue path
+        return ORJSONResponse(
+            {"download_id": download_id, "status": "pending", "message": "Audio download added to queue"}
         )
         
     except Exception as e:
-        logger.error(f"Error starting audio download: {e}")
+        logger.error("Error starting audio download: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/download/direct")
@@ -59,81 +169,98 @@ async def download_audio_direct(request: AudioDownloadRequest):
     """Download audio directly without queue"""
     try:
         # Prepare download options for audio extraction
-        options = {
-            'format': 'bestaudio/best',
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': request.format,
-                'preferredquality': request.quality if request.quality != 'best' else '320',
-            }],
-            'outtmpl': request.output_template or os.path.join(
-                settings.DOWNLOAD_DIR, 
-                '%(title).100s.%(ext)s'
-            ),
-            'restrictfilenames': True,
-            'windowsfilenames': True,
-        }
+        options = _build_audio_options(request.format, request.quality, request.output_template)
         
         # Download directly
-        filename = await downloader.download_video(str(request.url), options)
+        filename = await downloader.download_video(request.url_str, options)
         
         # The filename might change after post-processing
-        base_name = os.path.splitext(filename)[0]
-        audio_filename = f"{base_name}.{request.format}"
+        audio_path = Path(filename).with_suffix(f".{request.format}")
+        audio_name = audio_path.name
         
         return DownloadResponse(
             download_id="direct",
             status="completed",
             message="Audio downloaded successfully",
-            filename=os.path.basename(audio_filename),
-            file_path=audio_filename,
-            download_url=f"/downloads/{os.path.basename(audio_filename)}"
+            filename=audio_name,
+            file_path=str(audio_path),
+            download_url=f"/downloads/{audio_name}"
         )
         
     except Exception as e:
-        logger.error(f"Error downloading audio: {e}")
+        logger.error("Error downloading audio: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+def _summarize_audio_formats(info) -> Dict[str, Any]:
+    """Build the audio-only format summary returned by the extract endpoints"""
+    # Filter audio-only formats, sorted by quality (bitrate)
+    sorted_formats = sorted(
+        (f for f in info.formats if f.has_audio and not f.has_video),
+        key=lambda f: f.abr or 0,
+        reverse=True
+    )
+    audio_formats = [
+        {
+            'format_id': f.format_id,
+            'ext': f.ext,
+            'abr': f.abr,
+            'acodec': f.acodec,
+            'filesize': f.filesize or f.filesize_approx,
+            'quality': f.quality
+        }
+        for f in sorted_formats
+    ]
+    
+    return {
+        "title": info.title,
+        "duration": info.duration,
+        "audio_formats": audio_formats,
+        "recommended_format": audio_formats[0] if audio_formats else None
+    }
+
 @router.post("/extract")
 async def extract_audio_from_video(request: URLRequest):
     """Extract audio from video URL and return best available audio formats"""
     try:
-        info = await downloader.get_video_info(str(request.url))
-        
-        # Filter audio-only formats
-        audio_formats = [
-            {
-                'format_id': f.format_id,
-                'ext': f.ext,
-                'abr': f.abr,
-                'acodec': f.acodec,
-                'filesize': f.filesize or f.filesize_approx,
-                'quality': f.quality
-            }
-            for f in info.formats 
-            if f.has_audio and not f.has_video
-        ]
-        
-        # Sort by quality (bitrate)
-        audio_formats.sort(key=lambda x: x.get('abr', 0) or 0, reverse=True)
-        
-        return {
-            "title": info.title,
-            "duration": info.duration,
-            "audio_formats": audio_formats,
-            "recommended_format": audio_formats[0] if audio_formats else None
-        }
+        info = await metadata.get_video_info(request.url_str)
+        return _summarize_audio_formats(info)
         
     except Exception as e:
-        logger.error(f"Error extracting audio info: {e}")
+        logger.error("Error extracting audio info: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/extract/batch")
+async def extract_audio_batch(request: BatchURLRequest):
+    """Extract audio formats for several URLs concurrently"""
+    async def extract_one(url: str) -> Dict[str, Any]:
+        async with _extract_semaphore:
+            try:
+                info = await metadata.get_video_info(url)
+                return {"url": url, **_summarize_audio_formats(info)}
+            except Exception as e:
+                logger.error("Error extracting audio info for %s: %s", url, e)
+                return {"url": url, "error": str(e)}
+    
+    results = await asyncio.gather(*(extract_one(str(url)) for url in request.urls))
+    
+    return {
+        "results": results,
+        "succeeded": sum(1 for r in results if "error" not in r),
+        "failed": sum(1 for r in results if "error" in r)
+    }
+
+@router.delete("/extract/cache")
+async def clear_extract_cache():
+    """Clear cached video metadata so the next extract refreshes it"""
+    cleared = metadata.clear_metadata_caches()
+    return {"message": "Metadata cache cleared", "cleared": cleared}
+
 @router.post("/download/music/sponsorblock", response_model=DownloadResponse)
 async def download_music_with_sponsorblock(request: SponsorBlockMusicRequest):
     """Download music with SponsorBlock integration to automatically remove unwanted segments"""
     try:
         filename = await downloader.download_music_with_sponsorblock(
-            str(request.url),
+            request.url_str,
             request.quality,
             request.format,
             request.remove_categories,
@@ -141,111 +268,27 @@ async def download_music_with_sponsorblock(request: SponsorBlockMusicRequest):
             request.sponsorblock_api
         )
         
+        music_name = Path(filename).name
+        
         return DownloadResponse(
             download_id="sponsorblock_music_direct",
             status="completed",
             message="Music downloaded with SponsorBlock processing",
-            filename=os.path.basename(filename),
+            filename=music_name,
             file_path=filename,
-            download_url=f"/downloads/{os.path.basename(filename)}"
+            download_url=f"/downloads/{music_name}"
         )
         
     except Exception as e:
-        logger.error(f"Error downloading music with SponsorBlock: {e}")
+        logger.error("Error downloading music with SponsorBlock: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/sponsorblock/categories")
-async def get_sponsorblock_categories():
+async def get_sponsorblock_categories(request: Request):
     """Get available SponsorBlock categories with descriptions"""
-    return {
-        "categories": {
-            "sponsor": {
-                "name": "Sponsor",
-                "description": "Paid promotion, paid referrals and direct advertisements",
-                "color": "#00d400",
-                "recommended_for_music": True
-            },
-            "intro": {
-                "name": "Intermission/Intro Animation", 
-                "description": "An interval without actual content. Could be a pause, static frame, repeating animation",
-                "color": "#00ffff",
-                "recommended_for_music": True
-            },
-            "outro": {
-                "name": "Endcards/Credits",
-                "description": "Information that appears on screen after the main content",
-                "color": "#0202ed",
-                "recommended_for_music": True
-            },
-            "selfpromo": {
-                "name": "Unpaid/Self Promotion",
-                "description": "Self promotion: unpaid, charity, community, etc.",
-                "color": "#ffff00",
-                "recommended_for_music": True
-            },
-            "preview": {
-                "name": "Preview/Recap",
-                "description": "Quick recap of the previous video, or a preview of what's coming up",
-                "color": "#008fd6",
-                "recommended_for_music": False
-            },
-            "filler": {
-                "name": "Filler Tangent/Jokes",
-                "description": "Tangential scenes added only for filler or humor that are not required",
-                "color": "#7300ff",
-                "recommended_for_music": False
-            },
-            "interaction": {
-                "name": "Interaction Reminder",
-                "description": "When there is a short reminder to like, subscribe or interact",
-                "color": "#cc00ff",
-                "recommended_for_music": True
-            },
-            "music_offtopic": {
-                "name": "Non-Music Section",
-                "description": "Only for music videos. This includes introductions or outros in music videos",
-                "color": "#ff9900",
-                "recommended_for_music": True
-            }
-        },
-        "presets": {
-            "music_clean": {
-                "name": "Clean Music",
-                "description": "Perfect for music downloads - removes all non-music content",
-                "remove": ["sponsor", "intro", "outro", "selfpromo", "interaction", "music_offtopic"],
-                "mark": []
-            },
-            "music_minimal": {
-                "name": "Minimal Cleaning",
-                "description": "Only removes obvious promotions and sponsors",
-                "remove": ["sponsor", "selfpromo"],
-                "mark": []
-            },
-            "music_aggressive": {
-                "name": "Aggressive Cleaning",
-                "description": "Removes everything except the core music content",
-                "remove": ["sponsor", "intro", "outro", "selfpromo", "preview", "interaction", "music_offtopic"],
-                "mark": []
-            }
-        }
-    }
+    return SPONSORBLOCK_CATEGORIES.response(request)
 
 @router.get("/quality-presets")
-async def get_audio_quality_presets():
+async def get_audio_quality_presets(request: Request):
     """Get available audio quality presets"""
-    return {
-        "qualities": [
-            {"value": "best", "label": "Best Available", "description": "Highest quality available"},
-            {"value": "320", "label": "320 kbps", "description": "High quality MP3"},
-            {"value": "256", "label": "256 kbps", "description": "Good quality"},
-            {"value": "192", "label": "192 kbps", "description": "Standard quality"},
-            {"value": "128", "label": "128 kbps", "description": "Lower quality, smaller file"}
-        ],
-        "formats": [
-            {"value": "mp3", "label": "MP3", "description": "Most compatible format"},
-            {"value": "aac", "label": "AAC", "description": "Good quality, smaller files"},
-            {"value": "flac", "label": "FLAC", "description": "Lossless compression"},
-            {"value": "opus", "label": "Opus", "description": "Modern, efficient codec"},
-            {"value": "wav", "label": "WAV", "description": "Uncompressed audio"}
-        ]
-    }
\ No newline at end of file
+    return AUDIO_QUALITY_PRESETS.response(request)
@@ -4,19 +4,22 @@ Handles downloads using video info extracted from the user's browser
 """
 
 from fastapi import APIRouter, HTTPException, BackgroundTasks
-from pydantic import BaseModel, HttpUrl
-from typing import Dict, Any, Optional, List
+from pydantic import BaseModel, ConfigDict, model_validator
+from typing import Dict, Any, Optional, List, Callable
 import os
 import asyncio
-import requests
+import aiohttp
 import subprocess
-from datetime import datetime
+import time
 import uuid
 import tempfile
 import shutil
+from functools import lru_cache
 
 from core.config import settings
-import json
+from core.cache import AsyncTTLCache
+from core.registry import DownloadRegistry
+import orjson
 import re
 
 router = APIRouter()
@@ -40,6 +43,8 @@ INNERTUBE_CONTEXT = {
 }
 
 class BrowserVideoFormat(BaseModel):
+    model_config = ConfigDict(extra='ignore')
+
     format_id: str
     ext: str
     resolution: str
@@ -47,6 +52,7 @@ class BrowserVideoFormat(BaseModel):
     vcodec: str
     acodec: str
     filesize: Optional[int] = None
+    abr: Optional[float] = None
     url: Optional[str] = None
     has_video: bool
     has_audio: bool
@@ -54,6 +60,8 @@ class BrowserVideoFormat(BaseModel):
     quality: Optional[str] = None
 
 class BrowserVideoInfo(BaseModel):
+    model_config = ConfigDict(extra='ignore')
+
     id: str
     title: str
     duration: int
@@ -63,20 +71,86 @@ class BrowserVideoInfo(BaseModel):
     streamingData: Optional[Dict[str, Any]] = None
 
 class BrowserDownloadRequest(BaseModel):
-    video_info: BrowserVideoInfo
+    # Either the full info, or the id of a video extracted through /extract
+    video_info: Optional[BrowserVideoInfo] = None
+    video_id: Optional[str] = None
     selected_format_id: str
     merge_audio: bool = True
     audio_format_id: Optional[str] = None
     filename: Optional[str] = None
 
+    @model_validator(mode='after')
+    def check_video_source(self):
+        if self.video_info is None and not self.video_id:
+            raise ValueError("Either video_info or video_id is required")
+        return self
+
 class BrowserDownloadResponse(BaseModel):
     download_id: str
     filename: str
     status: str
     message: str
 
-# Store active downloads
-active_downloads = {}
+# Info from /extract, so /download can be started with just the video id
+extracted_info_cache = AsyncTTLCache(maxsize=1024, ttl=3600)
+
+# Store active downloads; finished entries are dropped after 10 minutes
+active_downloads = DownloadRegistry(maxsize=1024, finished_ttl=600)
+
+STREAM_CHUNK_SIZE = 1024 * 1024  # 1MB writes instead of 8KB
+PROGRESS_LOG_INTERVAL = 10 * 1024 * 1024  # Log stream progress every 10MB
+STREAM_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=60, sock_read=60)
+
+# googlevideo throttles each connection, so large streams are fetched as
+# parallel ~10MB Range requests, the chunk size mpv and yt-dlp use
+RANGE_SEGMENT_SIZE = 10 * 1024 * 1024
+RANGE_CONNECTIONS = 8
+
+# YouTube-specific headers to avoid 403 errors
+STREAM_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': '*/*',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept-Encoding': 'identity',  # Don't use compression for video streams
+    'Connection': 'keep-alive',
+    'Referer': 'https://www.youtube.com/',
+    'Origin': 'https://www.youtube.com',
+    'Sec-Fetch-Dest': 'video',
+    'Sec-Fetch-Mode': 'cors',
+    'Sec-Fetch-Site': 'cross-site',
+}
+
+# Shared HTTP session, created lazily on the running event loop
+_session: Optional[aiohttp.ClientSession] = None
+
+async def get_session() -> aiohttp.ClientSession:
+    """Get or create the aiohttp session used for YouTube requests"""
+    global _session
+    if _session is None or _session.closed:
+        # Keep-alive pool shared by ranged downloads and the InnerTube proxy,
+        # so TLS handshakes and DNS lookups are paid once per host
+        connector = aiohttp.TCPConnector(
+            limit=100,
+            limit_per_host=16,
+            ttl_dns_cache=300,
+            keepalive_timeout=60
+        )
+        _session = aiohttp.ClientSession(connector=connector)
+    return _session
+
+async def close_session():
+    """Close the shared aiohttp session"""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+# \w matches exactly what str.isalnum() accepts, plus the underscore
+UNSAFE_FILENAME_CHARS = re.compile(r'[^\w .-]')
+
+def sanitize_filename(filename: str) -> str:
+    """Keep only alphanumerics, spaces, dashes, underscores and dots"""
+    return UNSAFE_FILENAME_CHARS.sub('', filename).rstrip()
 
 class BrowserDownloadProgress:
     def __init__(self, download_id: str):
@@ -88,18 +162,19 @@ class BrowserDownloadProgress:
         self.error = None
 
 async def download_from_browser_info(download_id: str, video_info: BrowserVideoInfo, 
-                                   selected_format_id: str, merge_audio: bool = True,
-                                   audio_format_id: Optional[str] = None,
-                                   custom_filename: Optional[str] = None):
-    """Download video using browser-extracted info"""
+                                   output_filename: str, selected_format_id: str,
+                                   merge_audio: bool = True,
+                                   audio_format_id: Optional[str] = None):
+    """Download video using browser-extracted info; output_filename must already be sanitized"""
     progress = BrowserDownloadProgress(download_id)
-    active_downloads[download_id] = progress
+    active_downloads.add(download_id, progress)
     
     temp_dir = None
     
     try:
         # Create temporary directory
-        temp_dir = tempfile.mkdtemp(prefix=f"browser_dl_{download_id}_")
+        # Stage inside the downloads directory so finishing is a same-filesystem rename
+        temp_dir = tempfile.mkdtemp(prefix=f".browser_dl_{download_id}_", dir=settings.DOWNLOAD_DIR)
         progress.message = f"Created temp directory: {temp_dir}"
         
         # Find selected format
@@ -115,54 +190,88 @@ async def download_from_browser_info(download_id: str, video_info: BrowserVideoI
         if not selected_format:
             raise Exception(f"Selected format {selected_format_id} not found")
         
-        progress.status = "downloading"
-        progress.message = "Downloading video..."
+        # Pick the audio stream up front so both transfers can run together
+        audio_source = None
+        if merge_audio and not selected_format.has_audio:
+            if audio_format and audio_format.url:
+                audio_source = audio_format
+            else:
+                # Largest downloadable audio-only stream, with bitrate breaking ties among unknown sizes
+                audio_source = max(
+                    (fmt for fmt in video_info.formats if fmt.has_audio and not fmt.has_video and fmt.url),
+                    key=lambda fmt: (fmt.filesize or 0, fmt.abr or 0),
+                    default=None
+                )
+        
+        if audio_source:
+            # Fail before downloading anything if the merge can't run
+            ffmpeg_binary()
+        
+        # Byte counts per stream; downloading covers the first 90% of progress
+        transferred = {}
+        
+        def track(stream: str) -> Callable[[int, int], None]:
+            def on_progress(downloaded: int, total: int):
+                transferred[stream] = (downloaded, total)
+                total_bytes = sum(size for _, size in transferred.values())
+                if total_bytes:
+                    done_bytes = sum(done for done, _ in transferred.values())
+                    progress.progress = round(done_bytes / total_bytes * 90, 1)
+            return on_progress
         
-        # Download video
-        video_file = None
-        if selected_format.url:
+        async def fetch_video() -> Optional[str]:
+            if not selected_format.url:
+                progress.message = "No video URL available - stream may have expired"
+                print("[Error] No video URL in selected format")
+                return None
             try:
-                video_file = await download_stream(selected_format.url, temp_dir, f"video.{selected_format.ext}")
-                progress.progress = 50
+                video_file = await download_stream_ranged(
+                    selected_format.url, temp_dir, f"video.{selected_format.ext}",
+                    selected_format.filesize, track("video")
+                )
                 progress.message = f"Downloaded video ({selected_format.resolution})"
+                return video_file
             except Exception as e:
                 progress.message = f"Video download failed: {e}"
                 print(f"[Error] Video download failed: {e}")
-        else:
-            progress.message = "No video URL available - stream may have expired"
-            print("[Error] No video URL in selected format")
+                return None
+        
+        progress.status = "downloading"
+        progress.message = "Downloading video and audio..." if audio_source else "Downloading video..."
         
-        # Download audio if needed
+        # Download video and audio concurrently
+        video_task = asyncio.create_task(fetch_video())
         audio_file = None
-        if merge_audio and not selected_format.has_audio:
-            if audio_format and audio_format.url:
-                progress.message = "Downloading audio..."
-                audio_file = await download_stream(audio_format.url, temp_dir, f"audio.{audio_format.ext}")
-                progress.progress = 75
-            else:
-                # Find best audio format
-                best_audio = None
-                for fmt in video_info.formats:
-                    if fmt.has_audio and not fmt.has_video:
-                        if not best_audio or (fmt.filesize and best_audio.filesize and fmt.filesize > best_audio.filesize):
-                            best_audio = fmt
-                
-                if best_audio and best_audio.url:
-                    progress.message = "Downloading best audio..."
-                    audio_file = await download_stream(best_audio.url, temp_dir, f"audio.{best_audio.ext}")
-                    progress.progress = 75
+        try:
+            if audio_source:
+                audio_file = await download_stream_ranged(
+                    audio_source.url, temp_dir, f"audio.{audio_source.ext}",
+                    audio_source.filesize, track("audio")
+                )
+        except Exception:
+            video_task.cancel()
+            raise
+        video_file = await video_task
         
         # Merge if needed
-        output_filename = custom_filename or f"{video_info.title}.mp4"
-        output_filename = "".join(c for c in output_filename if c.isalnum() or c in (' ', '-', '_', '.')).rstrip()
         output_path = os.path.join(settings.DOWNLOAD_DIR, output_filename)
         
         if audio_file and video_file:
             progress.message = "Merging video and audio..."
-            await merge_video_audio(video_file, audio_file, output_path)
+            
+            def on_merge_progress(fraction: float):
+                progress.progress = round(90 + fraction * 10, 1)
+            
+            # Merge inside the temp dir, then move the finished file into place
+            merged_file = os.path.join(temp_dir, f"merged_{output_filename}")
+            await merge_video_audio(
+                video_file, audio_file, merged_file, audio_source.acodec,
+                video_info.duration, on_merge_progress
+            )
+            await asyncio.to_thread(finalize_output, merged_file, output_path)
         elif video_file:
-            progress.message = "Copying video file..."
-            shutil.copy2(video_file, output_path)
+            progress.message = "Moving video file..."
+            await asyncio.to_thread(finalize_output, video_file, output_path)
         else:
             raise Exception("No video file downloaded")
         
@@ -176,6 +285,8 @@ async def download_from_browser_info(download_id: str, video_info: BrowserVideoI
         progress.error = str(e)
         progress.message = f"Download failed: {e}"
     finally:
+        active_downloads.finish(download_id)
+        
         # Cleanup temp directory
         if temp_dir and os.path.exists(temp_dir):
             try:
@@ -183,54 +294,93 @@ async def download_from_browser_info(download_id: str, video_info: BrowserVideoI
             except Exception as e:
                 print(f"Failed to cleanup temp directory: {e}")
 
-async def download_stream(url: str, temp_dir: str, filename: str) -> str:
+def finalize_output(src: str, dst: str):
+    """Move a finished file into the downloads directory, copying only if a rename fails"""
+    dst_dir = os.path.dirname(dst) or '.'
+    if os.stat(src).st_dev != os.stat(dst_dir).st_dev:
+        shutil.copy2(src, dst)
+        return
+
+    try:
+        # Same filesystem: a rename moves no data at all
+        os.replace(src, dst)
+    except OSError:
+        # copy2 already copies in-kernel (sendfile on Linux, fcopyfile on macOS)
+        shutil.copy2(src, dst)
+
+def open_preallocated(path: str, size: int) -> int:
+    """Open a file for writing and reserve its full size on disk when known"""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o644)
+    if size:
+        try:
+            # Reserve real blocks so the file is laid out contiguously
+            os.posix_fallocate(fd, 0, size)
+        except (AttributeError, OSError):
+            # No fallocate on this platform or filesystem; just set the length
+            os.ftruncate(fd, size)
+    return fd
+
+def write_at(fd: int, data: bytes, offset: int):
+    """Write all of data at offset, retrying short writes"""
+    view = memoryview(data)
+    while view:
+        if hasattr(os, 'pwrite'):
+            written = os.pwrite(fd, view, offset)
+        else:
+            os.lseek(fd, offset, os.SEEK_SET)
+            written = os.write(fd, view)
+        view = view[written:]
+        offset += written
+
+async def download_stream(url: str, temp_dir: str, filename: str,
+                          progress_callback: Optional[Callable[[int, int], None]] = None) -> str:
     """Download a stream from URL with YouTube-specific headers"""
     output_path = os.path.join(temp_dir, filename)
 
     if not url:
         raise Exception(f"No URL provided for {filename}")
 
-    # YouTube-specific headers to avoid 403 errors
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': '*/*',
-        'Accept-Language': 'en-US,en;q=0.9',
-        'Accept-Encoding': 'identity',  # Don't use compression for video streams
-        'Connection': 'keep-alive',
-        'Range': 'bytes=0-',  # Request from beginning
-        'Referer': 'https://www.youtube.com/',
-        'Origin': 'https://www.youtube.com',
-        'Sec-Fetch-Dest': 'video',
-        'Sec-Fetch-Mode': 'cors',
-        'Sec-Fetch-Site': 'cross-site',
-    }
+    headers = {**STREAM_HEADERS, 'Range': 'bytes=0-'}  # Request from beginning
 
     print(f"[Download] Starting download: {filename}")
     print(f"[Download] URL: {url[:100]}...")
 
+    session = await get_session()
+
     try:
-        response = requests.get(url, headers=headers, stream=True, timeout=60)
-        print(f"[Download] Response status: {response.status_code}")
+        response = await session.get(url, headers=headers, timeout=STREAM_TIMEOUT)
+        print(f"[Download] Response status: {response.status}")
 
-        if response.status_code == 403:
+        if response.status == 403:
             print("[Download] Got 403, trying without Range header...")
+            response.release()
             headers.pop('Range', None)
-            response = requests.get(url, headers=headers, stream=True, timeout=60)
+            response = await session.get(url, headers=headers, timeout=STREAM_TIMEOUT)
 
-        response.raise_for_status()
+        async with response:
+            response.raise_for_status()
 
-        total_size = int(response.headers.get('content-length', 0))
-        downloaded = 0
+            total_size = response.content_length or 0
+            downloaded = 0
+            next_log = PROGRESS_LOG_INTERVAL
 
-        with open(output_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
+            fd = open_preallocated(output_path, total_size)
+            try:
+                async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                    await asyncio.to_thread(write_at, fd, chunk, downloaded)
                     downloaded += len(chunk)
-                    if total_size > 0:
-                        progress = (downloaded / total_size) * 100
-                        if downloaded % (1024 * 1024) == 0:  # Log every MB
-                            print(f"[Download] {filename}: {progress:.1f}% ({downloaded}/{total_size})")
+                    if progress_callback:
+                        progress_callback(downloaded, total_size)
+                    if downloaded >= next_log:
+                        next_log += PROGRESS_LOG_INTERVAL
+                        if total_size > 0:
+                            print(f"[Download] {filename}: {downloaded * 100 / total_size:.1f}% ({downloaded}/{total_size})")
+            finally:
+                os.close(fd)
+
+        # The file was sized up front, so a short body would leave zero padding
+        if total_size and downloaded != total_size:
+            raise Exception(f"Incomplete download: {filename} ({downloaded}/{total_size} bytes)")
 
         file_size = os.path.getsize(output_path)
         print(f"[Download] Completed: {filename} ({file_size} bytes)")
@@ -246,28 +396,141 @@ async def download_stream(url: str, temp_dir: str, filename: str) -> str:
             os.remove(output_path)
         raise
 
-async def merge_video_audio(video_path: str, audio_path: str, output_path: str):
-    """Merge video and audio using FFmpeg"""
+class RangeNotSupported(Exception):
+    """Raised when a server answers a Range request with the full body"""
+
+async def probe_stream_size(url: str) -> Optional[int]:
+    """Return the stream size if the server honours Range requests, else None"""
+    session = await get_session()
+    headers = {**STREAM_HEADERS, 'Range': 'bytes=0-0'}
+    try:
+        async with session.get(url, headers=headers, timeout=STREAM_TIMEOUT) as response:
+            if response.status != 206:
+                return None
+            total = response.headers.get('Content-Range', '').rpartition('/')[2]
+            return int(total) if total.isdigit() else None
+    except aiohttp.ClientError as e:
+        print(f"[Download] Size probe failed: {e}")
+        return None
+
+async def download_stream_ranged(url: str, temp_dir: str, filename: str, size: Optional[int] = None,
+                                 progress_callback: Optional[Callable[[int, int], None]] = None,
+                                 connections: int = RANGE_CONNECTIONS) -> str:
+    """Download a stream over parallel Range requests into a preallocated file"""
+    if not url:
+        raise Exception(f"No URL provided for {filename}")
+
+    if not size:
+        size = await probe_stream_size(url)
+
+    # Small or unsized streams, and platforms without pwrite, use one connection
+    if not size or size <= RANGE_SEGMENT_SIZE or not hasattr(os, 'pwrite'):
+        return await download_stream(url, temp_dir, filename, progress_callback)
+
+    output_path = os.path.join(temp_dir, filename)
+    session = await get_session()
+    semaphore = asyncio.Semaphore(connections)
+    downloaded = 0
+
+    print(f"[Download] Starting ranged download: {filename} ({size} bytes, {connections} connections)")
+
+    async def fetch_range(fd: int, start: int, end: int):
+        nonlocal downloaded
+        async with semaphore:
+            headers = {**STREAM_HEADERS, 'Range': f'bytes={start}-{end}'}
+            async with session.get(url, headers=headers, timeout=STREAM_TIMEOUT) as response:
+                if response.status != 206:
+                    raise RangeNotSupported(f"Expected 206 for bytes {start}-{end}, got {response.status}")
+
+                offset = start
+                async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                    await asyncio.to_thread(write_at, fd, chunk, offset)
+                    offset += len(chunk)
+                    downloaded += len(chunk)
+                    if progress_callback:
+                        progress_callback(downloaded, size)
+
+                if offset != end + 1:
+                    raise Exception(f"Incomplete range {start}-{end} for {filename}")
+
+    fd = open_preallocated(output_path, size)
+    tasks = []
+    try:
+        tasks = [
+            asyncio.create_task(fetch_range(fd, start, min(start + RANGE_SEGMENT_SIZE, size) - 1))
+            for start in range(0, size, RANGE_SEGMENT_SIZE)
+        ]
+        await asyncio.gather(*tasks)
+    except RangeNotSupported as e:
+        print(f"[Download] {e}, falling back to single connection")
+    except Exception as e:
+        print(f"[Download] Failed: {filename} - {e}")
+        raise
+    else:
+        print(f"[Download] Completed: {filename} ({size} bytes)")
+        return output_path
+    finally:
+        # Stop any ranges still writing before the descriptor is closed
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        os.close(fd)
+
+    return await download_stream(url, temp_dir, filename, progress_callback)
+
+@lru_cache(maxsize=1)
+def ffmpeg_binary() -> str:
+    """Resolve the ffmpeg executable once instead of searching PATH on every merge"""
+    path = shutil.which('ffmpeg')
+    if path is None:
+        raise Exception("FFmpeg not found on PATH; it is required to merge video and audio")
+    return path
+
+# Audio codecs the MP4 muxer accepts as-is; anything else (Opus, Vorbis) is re-encoded
+MP4_AUDIO_CODECS = ('mp4a', 'aac', 'mp3', 'ac-3', 'ec-3')
+
+async def merge_video_audio(video_path: str, audio_path: str, output_path: str,
+                            audio_codec: Optional[str] = None, duration: Optional[float] = None,
+                            progress_callback: Optional[Callable[[float], None]] = None):
+    """Merge video and audio using FFmpeg, stream-copying whenever the container allows"""
+    audio_args = ['-c:a', 'copy']
+    if output_path.endswith('.mp4') and not (audio_codec or '').lower().startswith(MP4_AUDIO_CODECS):
+        audio_args = ['-c:a', 'aac', '-b:a', '192k']
+
     cmd = [
-        'ffmpeg', '-y',
-        '-i', video_path,
-        '-i', audio_path,
+        ffmpeg_binary(), '-y', '-nostdin',
+        '-loglevel', 'error',
+        '-progress', 'pipe:1', '-nostats',
+        '-fflags', '+genpts',
+        '-thread_queue_size', '1024', '-i', video_path,
+        '-thread_queue_size', '1024', '-i', audio_path,
         '-c:v', 'copy',
-        '-c:a', 'aac',
+        *audio_args,
+        '-movflags', '+faststart',
         '-shortest',
         output_path
     ]
     
     process = await asyncio.create_subprocess_exec(
         *cmd,
+        stdin=asyncio.subprocess.DEVNULL,
         stdout=asyncio.subprocess.PIPE,
         stderr=asyncio.subprocess.PIPE
     )
+    # Drain stderr alongside stdout so neither pipe can fill up and stall ffmpeg
+    stderr_task = asyncio.create_task(process.stderr.read())
     
-    stdout, stderr = await process.communicate()
+    # -progress writes key=value lines as the merge advances
+    async for raw in process.stdout:
+        key, _, value = raw.decode(errors='ignore').strip().partition('=')
+        if key == 'out_time_us' and value.isdigit() and duration and progress_callback:
+            progress_callback(min(int(value) / (duration * 1_000_000), 1.0))
+    
+    await process.wait()
+    stderr = await stderr_task
     
     if process.returncode != 0:
-        raise Exception(f"FFmpeg failed: {stderr.decode()}")
+        raise Exception(f"FFmpeg failed: {stderr[-4096:].decode(errors='ignore')}")
 
 @router.post("/download", response_model=BrowserDownloadResponse)
 async def start_browser_download(request: BrowserDownloadRequest, background_tasks: BackgroundTasks):
@@ -275,15 +538,24 @@ async def start_browser_download(request: BrowserDownloadRequest, background_tas
     try:
         download_id = str(uuid.uuid4())
         
+        if request.video_info is not None:
+            # The task never reads streamingData; don't hold it for the whole download
+            video_info = request.video_info.model_copy(update={'streamingData': None})
+        else:
+            # Already validated when it was extracted
+            video_info = extracted_info_cache.get(request.video_id)
+            if video_info is None:
+                raise HTTPException(status_code=404, detail="Video info not found or expired, extract it again")
+        
         # Generate filename
         if request.filename:
             filename = request.filename
         else:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{request.video_info.title}_{timestamp}.mp4"
+            timestamp = time.strftime("%Y%m%d_%H%M%S")
+            filename = f"{video_info.title}_{timestamp}.mp4"
         
         # Clean filename
-        filename = "".join(c for c in filename if c.isalnum() or c in (' ', '-', '_', '.')).rstrip()
+        filename = sanitize_filename(filename)
         if not filename.endswith('.mp4'):
             filename += '.mp4'
         
@@ -291,11 +563,11 @@ async def start_browser_download(request: BrowserDownloadRequest, background_tas
         background_tasks.add_task(
             download_from_browser_info,
             download_id,
-            request.video_info,
+            video_info,
+            filename,
             request.selected_format_id,
             request.merge_audio,
-            request.audio_format_id,
-            filename
+            request.audio_format_id
         )
         
         return BrowserDownloadResponse(
@@ -305,16 +577,18 @@ async def start_browser_download(request: BrowserDownloadRequest, background_tas
             message="Browser-assisted download started"
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/status/{download_id}")
 async def get_browser_download_status(download_id: str):
     """Get download status"""
-    if download_id not in active_downloads:
+    progress = active_downloads.get(download_id)
+    if progress is None:
         raise HTTPException(status_code=404, detail="Download not found")
     
-    progress = active_downloads[download_id]
     return {
         "download_id": download_id,
         "status": progress.status,
@@ -362,30 +636,39 @@ async def extract_youtube_info(video_id: str):
             },
         }
 
-        response = requests.post(
+        session = await get_session()
+        async with session.post(
             f'https://www.youtube.com/youtubei/v1/player?key={INNERTUBE_API_KEY}',
             headers=headers,
             json=payload,
-            timeout=30
-        )
-
-        if not response.ok:
-            raise HTTPException(status_code=response.status_code, detail=f"YouTube API error: {response.status_code}")
+            timeout=aiohttp.ClientTimeout(total=30)
+        ) as response:
+            if not response.ok:
+                raise HTTPException(status_code=response.status, detail=f"YouTube API error: {response.status}")
 
-        data = response.json()
+            data = await response.json(loads=orjson.loads, content_type=None)
 
         if not data.get('videoDetails'):
             raise HTTPException(status_code=404, detail="Video not found or unavailable")
 
         # Parse the response into our format
         video_info = parse_youtube_response(data)
+        if video_info['id']:
+            extracted_info_cache.set(
+                video_info['id'],
+                BrowserVideoInfo.model_validate({**video_info, 'streamingData': None})
+            )
         return video_info
 
-    except requests.exceptions.RequestException as e:
+    except HTTPException:
+        raise
+    except aiohttp.ClientError as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch video info: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Extraction failed: {str(e)}")
 
+STREAMING_DATA_PASSTHROUGH = ('expiresInSeconds', 'dashManifestUrl', 'hlsManifestUrl', 'serverAbrStreamingUrl')
+
 def parse_youtube_response(player_response: dict) -> dict:
     """Parse YouTube player response into our video info format"""
     video_details = player_response.get('videoDetails', {})
@@ -410,17 +693,30 @@ def parse_youtube_response(player_response: dict) -> dict:
         'uploader': video_details.get('author', 'Unknown'),
         'thumbnail': video_details.get('thumbnail', {}).get('thumbnails', [{}])[0].get('url', ''),
         'formats': formats,
-        'streamingData': streaming_data,
+        # The format lists are already in 'formats'; echo only the stream metadata
+        'streamingData': {
+            key: streaming_data[key] for key in STREAMING_DATA_PASSTHROUGH if key in streaming_data
+        },
     }
 
+CODECS_RE = re.compile(r'codecs="([^"]+)"')
+MIME_EXTENSIONS = {
+    'video/mp4': 'mp4',
+    'audio/mp4': 'm4a',
+    'video/webm': 'webm',
+    'audio/webm': 'webm',
+    'video/3gpp': '3gp',
+}
+
 def parse_youtube_format(fmt: dict, format_type: str) -> dict:
     """Parse a YouTube format into our format structure"""
-    has_video = 'video' in fmt.get('mimeType', '')
-    has_audio = 'audio' in fmt.get('mimeType', '')
+    mime_type = fmt.get('mimeType', '')
+    base_type = mime_type.split(';', 1)[0].strip()
+    has_video = base_type.startswith('video/')
+    has_audio = base_type.startswith('audio/')
 
     # Extract codec info
-    mime_type = fmt.get('mimeType', '')
-    codecs_match = re.search(r'codecs="([^"]+)"', mime_type)
+    codecs_match = CODECS_RE.search(mime_type)
     codecs = codecs_match.group(1).split(', ') if codecs_match else []
 
     vcodec = 'none'
@@ -438,16 +734,11 @@ def parse_youtube_format(fmt: dict, format_type: str) -> dict:
     elif fmt.get('height'):
         resolution = f"{fmt['height']}p"
 
-    # Get extension from mime type
-    ext = 'unknown'
-    if 'mp4' in mime_type:
-        ext = 'mp4'
-    elif 'webm' in mime_type:
-        ext = 'webm'
-    elif '3gpp' in mime_type:
-        ext = '3gp'
-    elif 'audio/mp4' in mime_type:
-        ext = 'm4a'
+    ext = MIME_EXTENSIONS.get(base_type, 'unknown')
+
+    # Audio bitrate in kbps, as yt-dlp reports abr
+    bitrate = fmt.get('averageBitrate') or fmt.get('bitrate')
+    abr = round(bitrate / 1000, 1) if has_audio and bitrate else None
 
     return {
         'format_id': str(fmt.get('itag', 'unknown')),
@@ -457,6 +748,7 @@ def parse_youtube_format(fmt: dict, format_type: str) -> dict:
         'vcodec': vcodec,
         'acodec': acodec,
         'filesize': int(fmt.get('contentLength', 0)) if fmt.get('contentLength') else None,
+        'abr': abr,
         'url': fmt.get('url'),
         'has_video': has_video,
         'has_audio': has_audio,
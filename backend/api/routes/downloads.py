@@ -0,0 +1,119 @@
+"""
+Downloaded file serving routes with HTTP Range support
+"""
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from typing import AsyncGenerator, Optional, Tuple
+import asyncio
+import mimetypes
+import os
+import stat
+import aiofiles
+import starlette
+
+from core.config import settings
+
+router = APIRouter()
+
+CHUNK_SIZE = 1024 * 1024  # 1MB reads keep syscalls low for large media files
+
+# Starlette 0.39+ answers Range requests in FileResponse itself, and hands the
+# file to servers that implement the ASGI pathsend extension for zero-copy sends
+NATIVE_RANGE_SUPPORT = tuple(int(part) for part in starlette.__version__.split(".")[:2]) >= (0, 39)
+
+def resolve_download_path(file_path: str) -> Tuple[str, os.stat_result]:
+    """Resolve a requested path inside the downloads directory and stat it"""
+    download_dir = str(settings.download_path)
+    full_path = os.path.realpath(os.path.join(download_dir, file_path))
+
+    # Reject anything that escapes the downloads directory
+    if os.path.commonpath([download_dir, full_path]) != download_dir:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    try:
+        stat_result = os.stat(full_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    return full_path, stat_result
+
+def parse_range_header(range_header: str, file_size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single 'bytes=start-end' range; None means serve the whole file"""
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        # Multi-part and non-byte ranges are ignored, as RFC 9110 allows
+        return None
+
+    start_str, _, end_str = ranges.strip().partition("-")
+    try:
+        if start_str:
+            start = int(start_str)
+            end = min(int(end_str), file_size - 1) if end_str else file_size - 1
+        else:
+            # Suffix range: the last N bytes
+            start = max(file_size - int(end_str), 0)
+            end = file_size - 1
+    except ValueError:
+        return None
+
+    if start >= file_size or end < start:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{file_size}", "Accept-Ranges": "bytes"}
+        )
+
+    return start, end
+
+async def iter_file_range(path: str, start: int, end: int) -> AsyncGenerator[bytes, None]:
+    """Stream the inclusive byte range [start, end] of a file"""
+    remaining = end - start + 1
+    async with aiofiles.open(path, "rb") as f:
+        await f.seek(start)
+        while remaining > 0:
+            chunk = await f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+def file_response(request: Request, path: str, stat_result: os.stat_result,
+                  media_type: str, filename: Optional[str] = None) -> Response:
+    """Serve a stat-ed file via FileResponse (sendfile/pathsend), answering Range requests on older Starlette"""
+    if NATIVE_RANGE_SUPPORT:
+        return FileResponse(path, media_type=media_type, filename=filename, stat_result=stat_result)
+
+    file_size = stat_result.st_size
+    range_header = request.headers.get("range")
+    byte_range = parse_range_header(range_header, file_size) if range_header else None
+    if byte_range is None:
+        return FileResponse(
+            path, media_type=media_type, filename=filename,
+            headers={"Accept-Ranges": "bytes"}, stat_result=stat_result
+        )
+
+    start, end = byte_range
+    headers = {
+        "Content-Range": f"bytes {start}-{end}/{file_size}",
+        "Accept-Ranges": "bytes",
+        "Content-Length": str(end - start + 1),
+    }
+    if filename:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return StreamingResponse(
+        iter_file_range(path, start, end),
+        status_code=206,
+        media_type=media_type,
+        headers=headers
+    )
+
+@router.api_route("/downloads/{file_path:path}", methods=["GET", "HEAD"])
+async def serve_download(file_path: str, request: Request):
+    """Serve a downloaded file, honouring Range requests for seeking"""
+    # realpath and stat are blocking syscalls; one thread hop covers both
+    full_path, stat_result = await asyncio.to_thread(resolve_download_path, file_path)
+    media_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+    return file_response(request, full_path, stat_result, media_type)
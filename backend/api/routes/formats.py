@@ -2,28 +2,151 @@
 Format analysis and conversion API routes
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 import logging
+from operator import itemgetter
 from typing import Dict, List
 
 from core.models import URLRequest
-from core.downloader import downloader
+from core.responses import StaticJSON
+from services import metadata
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Static payloads, serialized once at import
+FORMAT_PRESETS = StaticJSON({
+    "video_presets": [
+        {
+            "name": "Best Quality",
+            "format": "best",
+            "description": "Highest quality available"
+        },
+        {
+            "name": "1080p",
+            "format": "best[height<=1080]",
+            "description": "Full HD quality"
+        },
+        {
+            "name": "720p",
+            "format": "best[height<=720]",
+            "description": "HD quality"
+        },
+        {
+            "name": "480p",
+            "format": "best[height<=480]",
+            "description": "Standard quality"
+        },
+        {
+            "name": "360p",
+            "format": "best[height<=360]",
+            "description": "Lower quality, smaller file"
+        }
+    ],
+    "audio_presets": [
+        {
+            "name": "Best Audio",
+            "format": "bestaudio",
+            "description": "Highest audio quality"
+        },
+        {
+            "name": "MP3 320kbps",
+            "format": "bestaudio[abr<=320]",
+            "codec": "mp3",
+            "description": "High quality MP3"
+        },
+        {
+            "name": "MP3 192kbps",
+            "format": "bestaudio[abr<=192]",
+            "codec": "mp3",
+            "description": "Standard quality MP3"
+        },
+        {
+            "name": "AAC",
+            "format": "bestaudio[acodec=aac]",
+            "codec": "aac",
+            "description": "AAC format"
+        }
+    ],
+    "custom_formats": {
+        "description": "You can use custom format selectors",
+        "examples": [
+            "best[ext=mp4]",
+            "worst[ext=webm]",
+            "bestvideo[height<=720]+bestaudio",
+            "best[filesize<100M]"
+        ]
+    }
+}, immutable=True)
+
+SUPPORTED_CODECS = StaticJSON({
+    "video_codecs": {
+        "h264": {
+            "name": "H.264/AVC",
+            "description": "Most compatible video codec",
+            "quality": "Good",
+            "compatibility": "Excellent"
+        },
+        "h265": {
+            "name": "H.265/HEVC",
+            "description": "Modern codec with better compression",
+            "quality": "Excellent",
+            "compatibility": "Good"
+        },
+        "vp9": {
+            "name": "VP9",
+            "description": "Google's open-source codec",
+            "quality": "Excellent",
+            "compatibility": "Good"
+        },
+        "av01": {
+            "name": "AV1",
+            "description": "Next-generation codec",
+            "quality": "Excellent",
+            "compatibility": "Limited"
+        }
+    },
+    "audio_codecs": {
+        "aac": {
+            "name": "AAC",
+            "description": "Advanced Audio Coding",
+            "quality": "Good",
+            "compatibility": "Excellent"
+        },
+        "mp3": {
+            "name": "MP3",
+            "description": "Most compatible audio format",
+            "quality": "Good",
+            "compatibility": "Excellent"
+        },
+        "opus": {
+            "name": "Opus",
+            "description": "Modern, efficient codec",
+            "quality": "Excellent",
+            "compatibility": "Good"
+        },
+        "flac": {
+            "name": "FLAC",
+            "description": "Lossless compression",
+            "quality": "Perfect",
+            "compatibility": "Good"
+        }
+    }
+}, immutable=True)
+
 @router.post("/analyze")
 async def analyze_formats(request: URLRequest):
     """Analyze available formats for a URL"""
     try:
-        info = await downloader.get_video_info(str(request.url))
+        info = await metadata.get_video_info(str(request.url))
         
-        # Categorize formats
+        # Categorize formats in one pass, pairing each with its sort key
         video_only = []
         audio_only = []
         combined = []
         
         for fmt in info.formats:
+            filesize = fmt.filesize or fmt.filesize_approx
             format_data = {
                 "format_id": fmt.format_id,
                 "ext": fmt.ext,
@@ -31,7 +154,7 @@ async def analyze_formats(request: URLRequest):
                 "fps": fmt.fps,
                 "vcodec": fmt.vcodec,
                 "acodec": fmt.acodec,
-                "filesize": fmt.filesize or fmt.filesize_approx,
+                "filesize": filesize,
                 "tbr": fmt.tbr,
                 "vbr": fmt.vbr,
                 "abr": fmt.abr,
@@ -40,16 +163,22 @@ async def analyze_formats(request: URLRequest):
             }
             
             if fmt.has_video and fmt.has_audio:
-                combined.append(format_data)
+                combined.append(((fmt.quality or 0, fmt.tbr or 0), format_data))
             elif fmt.has_video:
-                video_only.append(format_data)
+                video_only.append(((fmt.quality or 0, fmt.vbr or 0), format_data))
             elif fmt.has_audio:
-                audio_only.append(format_data)
+                audio_only.append((fmt.abr or 0, format_data))
         
-        # Sort formats by quality
-        combined.sort(key=lambda x: (x.get('quality') or 0, x.get('tbr') or 0), reverse=True)
-        video_only.sort(key=lambda x: (x.get('quality') or 0, x.get('vbr') or 0), reverse=True)
-        audio_only.sort(key=lambda x: (x.get('abr') or 0), reverse=True)
+        # Sort formats by quality; itemgetter keeps the dicts out of comparisons
+        by_key = itemgetter(0)
+        combined.sort(key=by_key, reverse=True)
+        video_only.sort(key=by_key, reverse=True)
+        audio_only.sort(key=by_key, reverse=True)
+        combined = [data for _, data in combined]
+        video_only = [data for _, data in video_only]
+        audio_only = [data for _, data in audio_only]
+        # Taken from the sorted list so equal or unknown sizes resolve to the best quality
+        smallest = min(combined, key=lambda f: f['filesize'] or float('inf'), default=None)
         
         return {
             "video_info": {
@@ -68,7 +197,7 @@ async def analyze_formats(request: URLRequest):
             "recommendations": {
                 "best_quality": combined[0] if combined else None,
                 "best_audio": audio_only[0] if audio_only else None,
-                "smallest_size": min(combined, key=lambda x: x.get('filesize') or float('inf')) if combined else None
+                "smallest_size": smallest
             }
         }
         
@@ -77,77 +206,15 @@ async def analyze_formats(request: URLRequest):
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/presets")
-async def get_format_presets():
+async def get_format_presets(request: Request):
     """Get predefined format presets"""
-    return {
-        "video_presets": [
-            {
-                "name": "Best Quality",
-                "format": "best",
-                "description": "Highest quality available"
-            },
-            {
-                "name": "1080p",
-                "format": "best[height<=1080]",
-                "description": "Full HD quality"
-            },
-            {
-                "name": "720p",
-                "format": "best[height<=720]",
-                "description": "HD quality"
-            },
-            {
-                "name": "480p",
-                "format": "best[height<=480]",
-                "description": "Standard quality"
-            },
-            {
-                "name": "360p",
-                "format": "best[height<=360]",
-                "description": "Lower quality, smaller file"
-            }
-        ],
-        "audio_presets": [
-            {
-                "name": "Best Audio",
-                "format": "bestaudio",
-                "description": "Highest audio quality"
-            },
-            {
-                "name": "MP3 320kbps",
-                "format": "bestaudio[abr<=320]",
-                "codec": "mp3",
-                "description": "High quality MP3"
-            },
-            {
-                "name": "MP3 192kbps",
-                "format": "bestaudio[abr<=192]",
-                "codec": "mp3",
-                "description": "Standard quality MP3"
-            },
-            {
-                "name": "AAC",
-                "format": "bestaudio[acodec=aac]",
-                "codec": "aac",
-                "description": "AAC format"
-            }
-        ],
-        "custom_formats": {
-            "description": "You can use custom format selectors",
-            "examples": [
-                "best[ext=mp4]",
-                "worst[ext=webm]",
-                "bestvideo[height<=720]+bestaudio",
-                "best[filesize<100M]"
-            ]
-        }
-    }
+    return FORMAT_PRESETS.response(request)
 
 @router.post("/compare")
 async def compare_formats(request: URLRequest, format_ids: List[str]):
     """Compare specific formats"""
     try:
-        info = await downloader.get_video_info(str(request.url))
+        info = await metadata.get_video_info(str(request.url))
         
         # Find requested formats
         selected_formats = []
@@ -194,59 +261,6 @@ async def compare_formats(request: URLRequest, format_ids: List[str]):
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/codecs")
-async def get_supported_codecs():
+async def get_supported_codecs(request: Request):
     """Get information about supported codecs"""
-    return {
-        "video_codecs": {
-            "h264": {
-                "name": "H.264/AVC",
-                "description": "Most compatible video codec",
-                "quality": "Good",
-                "compatibility": "Excellent"
-            },
-            "h265": {
-                "name": "H.265/HEVC",
-                "description": "Modern codec with better compression",
-                "quality": "Excellent",
-                "compatibility": "Good"
-            },
-            "vp9": {
-                "name": "VP9",
-                "description": "Google's open-source codec",
-                "quality": "Excellent",
-                "compatibility": "Good"
-            },
-            "av01": {
-                "name": "AV1",
-                "description": "Next-generation codec",
-                "quality": "Excellent",
-                "compatibility": "Limited"
-            }
-        },
-        "audio_codecs": {
-            "aac": {
-                "name": "AAC",
-                "description": "Advanced Audio Coding",
-                "quality": "Good",
-                "compatibility": "Excellent"
-            },
-            "mp3": {
-                "name": "MP3",
-                "description": "Most compatible audio format",
-                "quality": "Good",
-                "compatibility": "Excellent"
-            },
-            "opus": {
-                "name": "Opus",
-                "description": "Modern, efficient codec",
-                "quality": "Excellent",
-                "compatibility": "Good"
-            },
-            "flac": {
-                "name": "FLAC",
-                "description": "Lossless compression",
-                "quality": "Perfect",
-                "compatibility": "Good"
-            }
-        }
-    }
\ No newline at end of file
+    return SUPPORTED_CODECS.response(request)
\ No newline at end of file
@@ -7,7 +7,8 @@ import logging
 
 from core.models import LiveStreamRequest, DownloadResponse, URLRequest
 from core.downloader import downloader
-from services.queue_manager import queue_manager
+from services.queue_manager import queue_manager, LiveJob
+from services import metadata
 from core.config import settings
 
 router = APIRouter()
@@ -17,7 +18,7 @@ logger = logging.getLogger(__name__)
 async def get_live_stream_info(request: URLRequest):
     """Get live stream information"""
     try:
-        info = await downloader.get_video_info(str(request.url))
+        info = await metadata.get_live_info(str(request.url))
         
         return {
             "title": info.title,
@@ -61,14 +62,8 @@ async def download_live_stream(request: LiveStreamRequest):
             options['external_downloader_args'] = ['-t', str(request.duration)]
         
         # Add to queue with high priority for live streams
-        download_request = {
-            'type': 'live',
-            'url': str(request.url),
-            'options': options,
-            'priority': 10  # High priority for live streams
-        }
-        
-        download_id = await queue_manager.add_to_queue(download_request)
+        job = LiveJob(url=str(request.url), options=options, priority=10)
+        download_id = await queue_manager.add_to_queue(job)
         
         return DownloadResponse(
             download_id=download_id,
@@ -103,14 +98,8 @@ async def record_live_stream(request: LiveStreamRequest):
         options['writeinfojson'] = True
         options['writethumbnail'] = True
         
-        download_request = {
-            'type': 'live_record',
-            'url': str(request.url),
-            'options': options,
-            'priority': 10
-        }
-        
-        download_id = await queue_manager.add_to_queue(download_request)
+        job = LiveJob(url=str(request.url), options=options, priority=10)
+        download_id = await queue_manager.add_to_queue(job)
         
         return DownloadResponse(
             download_id=download_id,
@@ -127,7 +116,7 @@ async def check_live_status(video_id: str):
     """Check if a YouTube video is currently live"""
     try:
         url = f"https://www.youtube.com/watch?v={video_id}"
-        info = await downloader.get_video_info(url)
+        info = await metadata.get_live_info(url)
         
         return {
             "video_id": video_id,
@@ -2,14 +2,16 @@
 M3U8 download API routes
 """
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Request
 from pydantic import BaseModel, HttpUrl
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
+from functools import lru_cache
 import os
 import asyncio
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import time
 import uuid
 import re
 
@@ -17,11 +19,21 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 from m3u8 import download_m3u8_video
+from core.config import settings
+from core.database import save_download_record, get_download_record
+from core.registry import DownloadRegistry
+from api.routes.downloads import file_response
 
 router = APIRouter()
 
-# Store active downloads
-active_downloads = {}
+# Store active downloads; finished entries are dropped after 10 minutes
+active_downloads = DownloadRegistry(maxsize=1000, finished_ttl=600)
+
+# M3U8 output directory; ensure_directories() creates it at startup
+DOWNLOADS_DIR = settings.DOWNLOAD_DIR
+
+# Anything but word characters, dashes and dots is replaced in filenames
+UNSAFE_FILENAME_CHARS = re.compile(r'[^\w\-.]')
 
 # Pydantic models
 class M3U8DownloadRequest(BaseModel):
@@ -41,6 +53,16 @@ class DownloadStatus(BaseModel):
     output_file: Optional[str] = None
     error: Optional[str] = None
 
+# A single writer thread keeps progress rows in submission order
+record_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="m3u8-record")
+
+def write_record(download_id: str, fields: Dict[str, Any]):
+    """Persist download state, logging instead of failing the download"""
+    try:
+        save_download_record(download_id, **fields)
+    except Exception as e:
+        print(f"[M3U8] Failed to save progress for {download_id}: {e}")
+
 class DownloadProgress:
     def __init__(self, download_id):
         self.download_id = download_id
@@ -49,21 +71,48 @@ class DownloadProgress:
         self.message = ""
         self.output_file = None
         self.error = None
+        self.filename = None
+        self.saved_percent = -1
+        self.loop = asyncio.get_running_loop()
 
     def update(self, data):
-        """Update progress"""
+        """Update progress, hopping onto the event loop when called from a segment thread"""
+        try:
+            on_loop = asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            on_loop = False
+        if not on_loop:
+            self.loop.call_soon_threadsafe(self.update, data)
+            return
+
         if data["type"] == "log":
             self.message = data["message"]
         elif data["type"] == "progress":
             self.progress = data["percentage"]
+            # Persist whole-percent steps, not every segment
+            if int(self.progress) != self.saved_percent:
+                self.saved_percent = int(self.progress)
+                self.save()
+
+    def save(self, **fields):
+        """Queue a write of the current state to the downloads table"""
+        record_writer.submit(write_record, self.download_id, {
+            'status': self.status,
+            'progress': self.progress,
+            'file_path': self.output_file,
+            'error_message': self.error,
+            **fields
+        })
 
 async def run_download(download_id: str, m3u8_url: str, output_path: str):
     """Run download in background"""
     progress_tracker = DownloadProgress(download_id)
-    active_downloads[download_id] = progress_tracker
+    progress_tracker.filename = os.path.basename(output_path)
+    active_downloads.add(download_id, progress_tracker)
 
     try:
         progress_tracker.status = "downloading"
+        progress_tracker.save(url=m3u8_url, mode="m3u8", filename=os.path.basename(output_path))
         result_path = await download_m3u8_video(
             m3u8_url,
             output_path,
@@ -73,10 +122,16 @@ async def run_download(download_id: str, m3u8_url: str, output_path: str):
         progress_tracker.status = "completed"
         progress_tracker.output_file = result_path
         progress_tracker.progress = 100
+        progress_tracker.save(completed_at=datetime.now())
 
     except Exception as e:
         progress_tracker.status = "failed"
         progress_tracker.error = str(e)
+        progress_tracker.save()
+    finally:
+        active_downloads.finish(download_id)
+        # The output grew without touching the directory mtime; rebuild the listing
+        scan_downloads.cache_clear()
 
 @router.post("/download", response_model=DownloadResponse)
 async def start_m3u8_download(request: M3U8DownloadRequest, background_tasks: BackgroundTasks):
@@ -90,15 +145,14 @@ async def start_m3u8_download(request: M3U8DownloadRequest, background_tasks: Ba
 
         if custom_name:
             # Clean filename
-            filename = re.sub(r'[^\w\-_\.]', '_', custom_name)
+            filename = UNSAFE_FILENAME_CHARS.sub('_', custom_name)
             if not filename.endswith('.mp4'):
                 filename += '.mp4'
         else:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            timestamp = time.strftime("%Y%m%d_%H%M%S")
             filename = f"m3u8_download_{timestamp}.mp4"
 
-        output_path = os.path.join('downloads', filename)
-        os.makedirs('downloads', exist_ok=True)
+        output_path = os.path.join(DOWNLOADS_DIR, filename)
 
         # Start download in background
         background_tasks.add_task(run_download, download_id, m3u8_url, output_path)
@@ -115,10 +169,22 @@ async def start_m3u8_download(request: M3U8DownloadRequest, background_tasks: Ba
 @router.get("/status/{download_id}", response_model=DownloadStatus)
 async def get_download_status(download_id: str):
     """Get download status"""
-    if download_id not in active_downloads:
-        raise HTTPException(status_code=404, detail="Download not found")
+    progress = active_downloads.get(download_id)
+    if progress is None:
+        # Started by another worker, or before a restart
+        record = await asyncio.to_thread(get_download_record, download_id)
+        if record is None or record.mode != "m3u8":
+            raise HTTPException(status_code=404, detail="Download not found")
+
+        return DownloadStatus(
+            download_id=download_id,
+            status=record.status,
+            progress=record.progress or 0,
+            message="",
+            output_file=os.path.basename(record.file_path) if record.file_path else None,
+            error=record.error_message
+        )
 
-    progress = active_downloads[download_id]
     return DownloadStatus(
         download_id=download_id,
         status=progress.status,
@@ -129,41 +195,60 @@ async def get_download_status(download_id: str):
     )
 
 @router.get("/download/{filename}")
-async def download_file(filename: str):
+async def download_file(filename: str, request: Request):
     """Download completed file"""
     try:
         # Clean filename for security
-        clean_filename = re.sub(r'[^\w\-_\.]', '_', filename)
-        file_path = os.path.join('downloads', clean_filename)
+        clean_filename = UNSAFE_FILENAME_CHARS.sub('_', filename)
+        file_path = os.path.join(DOWNLOADS_DIR, clean_filename)
 
-        if not os.path.exists(file_path):
+        # One stat, off the event loop, serves both the existence check and the response headers
+        try:
+            stat_result = await asyncio.to_thread(os.stat, file_path)
+        except FileNotFoundError:
             raise HTTPException(status_code=404, detail="File not found")
 
-        return FileResponse(
-            path=file_path,
-            filename=clean_filename,
-            media_type='video/mp4'
-        )
+        # FileResponse hands the file to servers supporting ASGI pathsend,
+        # so the body can go out via sendfile without passing through Python;
+        # Range requests let players seek without re-downloading
+        return file_response(request, file_path, stat_result, 'video/mp4', filename=clean_filename)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@lru_cache(maxsize=1)
+def scan_downloads(downloads_dir: str, dir_mtime_ns: int) -> Tuple[Dict[str, Any], ...]:
+    """List .mp4 files in a directory; cached until the directory mtime changes"""
+    files = []
+    with os.scandir(downloads_dir) as entries:
+        for entry in entries:
+            if entry.name.endswith('.mp4') and entry.is_file():
+                stat = entry.stat()
+                files.append({
+                    'filename': entry.name,
+                    'size': stat.st_size,
+                    'created': datetime.fromtimestamp(stat.st_ctime).isoformat(),
+                    'modified': datetime.fromtimestamp(stat.st_mtime).isoformat()
+                })
+    return tuple(files)
+
 @router.get("/downloads")
 async def list_downloads():
     """List all downloads"""
     downloads = []
-    downloads_dir = 'downloads'
+    downloads_dir = DOWNLOADS_DIR
 
     if os.path.exists(downloads_dir):
-        for filename in os.listdir(downloads_dir):
-            if filename.endswith('.mp4'):
-                file_path = os.path.join(downloads_dir, filename)
-                stat = os.stat(file_path)
-                downloads.append({
-                    'filename': filename,
-                    'size': stat.st_size,
-                    'created': datetime.fromtimestamp(stat.st_ctime).isoformat(),
-                    'modified': datetime.fromtimestamp(stat.st_mtime).isoformat()
-                })
+        # Files still being written are reported below as active downloads
+        in_progress = {
+            p.filename for _, p in active_downloads.items()
+            if p.status in ('downloading', 'starting')
+        }
+        downloads.extend(
+            entry for entry in scan_downloads(downloads_dir, os.stat(downloads_dir).st_mtime_ns)
+            if entry['filename'] not in in_progress
+        )
 
     # Add active downloads
     for download_id, progress in active_downloads.items():
@@ -5,29 +5,49 @@ Playlist download API routes
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
 import os
-import json
+import orjson
 import asyncio
 import logging
 from typing import AsyncGenerator
 
-from core.models import PlaylistDownloadRequest, DownloadResponse, URLRequest, PlaylistInfo
+from core.models import PlaylistDownloadRequest, DownloadResponse, URLRequest, PlaylistInfo, QualityPreset
 from core.downloader import downloader
-from services.queue_manager import queue_manager
+from services.queue_manager import queue_manager, DownloadJob, AudioJob, PlaylistJob
+from services import metadata
 from core.config import settings
+from core.ratelimit import AsyncRateLimiter
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Merging selectors for presets that cap height; other presets are used as-is
+MERGE_FORMATS = {
+    QualityPreset.BEST: "bestvideo+bestaudio/best",
+    QualityPreset.HD: "bestvideo[height<=720]+bestaudio/best",
+    QualityPreset.FHD: "bestvideo[height<=1080]+bestaudio/best",
+    QualityPreset.UHD: "bestvideo[height<=2160]+bestaudio/best",
+}
+
 @router.post("/info", response_model=PlaylistInfo)
 async def get_playlist_info(request: URLRequest):
     """Get playlist information"""
     try:
-        info = await downloader.get_playlist_info(str(request.url))
+        info = await metadata.get_playlist_info(str(request.url))
         return info
     except Exception as e:
         logger.error(f"Error getting playlist info: {e}")
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/info/full", response_model=PlaylistInfo)
+async def get_playlist_info_full(request: URLRequest):
+    """Get playlist information with full metadata for every video"""
+    try:
+        info = await metadata.get_playlist_info_full(str(request.url))
+        return info
+    except Exception as e:
+        logger.error(f"Error getting full playlist info: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.post("/download", response_model=DownloadResponse)
 async def download_playlist(request: PlaylistDownloadRequest):
     """Download entire playlist or selected videos"""
@@ -51,7 +71,7 @@ async def download_playlist(request: PlaylistDownloadRequest):
             }
         else:
             # For video, use merge format for high quality
-            format_selector = "bestvideo+bestaudio/best" if request.quality.value == "best" else f"bestvideo[height<={request.quality.value.split('<=')[1].rstrip(']')}]+bestaudio/best" if "height<=" in request.quality.value else request.quality.value
+            format_selector = MERGE_FORMATS.get(request.quality, request.quality.value)
             options = {
                 'format': format_selector,
                 'merge_output_format': 'mp4',
@@ -70,13 +90,8 @@ async def download_playlist(request: PlaylistDownloadRequest):
             playlist_url = str(request.url)
             for video_id in request.video_ids:
                 video_url = f"https://www.youtube.com/watch?v={video_id}"
-                download_request = {
-                    'type': request.mode,
-                    'url': video_url,
-                    'options': options.copy(),
-                    'priority': 0
-                }
-                await queue_manager.add_to_queue(download_request)
+                job_class = AudioJob if request.mode == "audio" else DownloadJob
+                await queue_manager.add_to_queue(job_class(url=video_url, options=options.copy(), priority=0))
         else:
             # Download entire playlist
             if request.start_index or request.end_index:
@@ -84,13 +99,7 @@ async def download_playlist(request: PlaylistDownloadRequest):
                 if request.end_index:
                     options['playlistend'] = request.end_index
             
-            download_request = {
-                'type': f'playlist_{request.mode}',
-                'url': str(request.url),
-                'options': options,
-                'priority': 0
-            }
-            await queue_manager.add_to_queue(download_request)
+            await queue_manager.add_to_queue(PlaylistJob(url=str(request.url), options=options, priority=0))
         
         return DownloadResponse(
             download_id="playlist",
@@ -102,16 +111,32 @@ async def download_playlist(request: PlaylistDownloadRequest):
         logger.error(f"Error starting playlist download: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def sse_event(payload: dict) -> bytes:
+    """Encode one server-sent event"""
+    return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+# Progress events are emitted once per video, so only the variable parts get encoded
+PROGRESS_PREFIX = b'data: {"type":"progress","data":{"current":'
+PROGRESS_SUFFIXES = {
+    status: b',"status":' + orjson.dumps(status) + b'}}\n\n'
+    for status in ('success', 'error')
+}
+
+def sse_progress(current: int, total: bytes, filename: str, status: str) -> bytes:
+    """Encode a progress event from the prebuilt template"""
+    return (PROGRESS_PREFIX + b'%d,"total":%b,"filename":%b' % (current, total, orjson.dumps(filename))
+            + PROGRESS_SUFFIXES[status])
+
 @router.get("/download/stream")
 async def download_playlist_stream(url: str, mode: str = "audio", format: str = "mp3"):
     """Stream playlist download progress"""
     
-    async def generate_progress() -> AsyncGenerator[str, None]:
+    async def generate_progress() -> AsyncGenerator[bytes, None]:
         try:
             # Get playlist info first
-            playlist_info = await downloader.get_playlist_info(url)
+            playlist_info = await metadata.get_playlist_info(url)
             
-            yield f"data: {json.dumps({'type': 'info', 'data': {'total': playlist_info.video_count, 'title': playlist_info.title}})}\n\n"
+            yield sse_event({'type': 'info', 'data': {'total': playlist_info.video_count, 'title': playlist_info.title}})
             
             # Prepare download options
             if mode == "audio":
@@ -143,35 +168,43 @@ async def download_playlist_stream(url: str, mode: str = "audio", format: str =
             downloaded_count = 0
             failed_count = 0
             
-            # Download each video
-            for video in playlist_info.videos:
-                try:
-                    video_url = f"https://www.youtube.com/watch?v={video['id']}"
-                    
-                    # Progress callback for individual video
-                    def progress_callback(progress_data):
-                        pass  # Individual video progress can be handled here
-                    
-                    filename = await downloader.download_video(video_url, options, progress_callback)
-                    downloaded_count += 1
-                    
-                    yield f"data: {json.dumps({'type': 'progress', 'data': {'current': downloaded_count, 'total': playlist_info.video_count, 'filename': os.path.basename(filename), 'status': 'success'}})}\n\n"
-                    
-                except Exception as e:
-                    failed_count += 1
-                    error_msg = f"Failed: {video['title']} - {str(e)}"
-                    
-                    yield f"data: {json.dumps({'type': 'progress', 'data': {'current': downloaded_count + failed_count, 'total': playlist_info.video_count, 'filename': error_msg, 'status': 'error'}})}\n\n"
-                
-                # Small delay to prevent overwhelming
-                await asyncio.sleep(0.1)
+            # Download videos concurrently, reporting each as it finishes;
+            # the limiter only spaces out starts so bursts don't hammer YouTube
+            semaphore = asyncio.Semaphore(settings.MAX_CONCURRENT_DOWNLOADS)
+            limiter = AsyncRateLimiter(max_rate=settings.PLAYLIST_RPS, time_period=1)
+            
+            async def download_one(video: dict):
+                video_url = f"https://www.youtube.com/watch?v={video['id']}"
+                async with semaphore:
+                    await limiter.acquire()
+                    try:
+                        return video, await downloader.download_video(video_url, options, None), None
+                    except Exception as e:
+                        return video, None, e
+            
+            total = orjson.dumps(playlist_info.video_count)
+            tasks = [asyncio.create_task(download_one(video)) for video in playlist_info.videos]
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    video, filename, error = await next_done
+                    if error is None:
+                        downloaded_count += 1
+                        yield sse_progress(downloaded_count + failed_count, total, os.path.basename(filename), 'success')
+                    else:
+                        failed_count += 1
+                        error_msg = f"Failed: {video['title']} - {str(error)}"
+                        yield sse_progress(downloaded_count + failed_count, total, error_msg, 'error')
+            finally:
+                # Client went away or something broke: stop the remaining downloads
+                for task in tasks:
+                    task.cancel()
             
             # Send completion
-            yield f"data: {json.dumps({'type': 'complete', 'data': {'downloaded': downloaded_count, 'failed': failed_count, 'total': playlist_info.video_count}})}\n\n"
+            yield sse_event({'type': 'complete', 'data': {'downloaded': downloaded_count, 'failed': failed_count, 'total': playlist_info.video_count}})
             
         except Exception as e:
             logger.error(f"Playlist download stream error: {e}")
-            yield f"data: {json.dumps({'type': 'error', 'data': {'message': str(e)}})}\n\n"
+            yield sse_event({'type': 'error', 'data': {'message': str(e)}})
     
     return StreamingResponse(
         generate_progress(),
@@ -187,7 +220,7 @@ async def download_playlist_stream(url: str, mode: str = "audio", format: str =
 async def download_playlist_batch(request: PlaylistDownloadRequest):
     """Download playlist in batches for better performance"""
     try:
-        playlist_info = await downloader.get_playlist_info(str(request.url))
+        playlist_info = await metadata.get_playlist_info(str(request.url))
         
         # Determine which videos to download
         videos_to_download = playlist_info.videos
@@ -198,8 +231,8 @@ async def download_playlist_batch(request: PlaylistDownloadRequest):
             end = request.end_index or len(playlist_info.videos)
             videos_to_download = playlist_info.videos[start:end]
         
-        # Add each video to queue with batch priority
-        download_ids = []
+        # Build every job first, then enqueue them in one call
+        jobs = []
         for i, video in enumerate(videos_to_download):
             video_url = f"https://www.youtube.com/watch?v={video['id']}"
             
@@ -227,17 +260,18 @@ async def download_playlist_batch(request: PlaylistDownloadRequest):
                     ),
                 }
             
-            download_request = {
-                'type': request.mode,
-                'url': video_url,
-                'options': options,
-                'priority': 0,
-                'batch_id': f"playlist_{playlist_info.id}",
-                'batch_index': i
-            }
+            job_class = AudioJob if request.mode == "audio" else DownloadJob
+            job = job_class(
+                url=video_url,
+                options=options,
+                priority=0,
+                batch_id=f"playlist_{playlist_info.id}",
+                batch_index=i
+            )
             
-            download_id = await queue_manager.add_to_queue(download_request)
-            download_ids.append(download_id)
+            jobs.append(job)
+        
+        download_ids = await queue_manager.add_many(jobs)
         
         return {
             "message": f"Added {len(videos_to_download)} videos to download queue",
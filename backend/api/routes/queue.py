@@ -2,8 +2,11 @@
 Download queue management API routes
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Response
+from operator import itemgetter
+from typing import Optional, Tuple
 import logging
+import orjson
 
 from core.models import QueueStatus, DownloadStatus
 from services.queue_manager import queue_manager
@@ -21,20 +24,35 @@ async def get_queue_status():
         logger.error(f"Error getting queue status: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# (queue version, serialized body) of the last /downloads response
+_downloads_snapshot: Tuple[Optional[int], bytes] = (None, b"")
+
+# Field getters for the /downloads listing, one C call per entry
+_queue_fields = itemgetter('download_id', 'created_at', 'job')
+_active_fields = itemgetter('started_at', 'job')
+_completed_fields = itemgetter('completed_at', 'result')
+_failed_fields = itemgetter('failed_at', 'error')
+
 @router.get("/downloads")
 async def get_all_downloads():
     """Get status of all downloads"""
+    global _downloads_snapshot
     try:
-        # Get queue items
+        # Nothing changed since the last poll: resend the same bytes
+        version, body = _downloads_snapshot
+        if version == queue_manager.version:
+            return Response(content=body, media_type="application/json")
+        
+        # Get queue items, in heap order (highest priority first, not fully sorted)
         queue_items = [
             {
-                "download_id": item['download_id'],
+                "download_id": download_id,
                 "status": "pending",
-                "created_at": item['created_at'],
-                "url": item['request'].get('url'),
-                "type": item['request'].get('type')
+                "created_at": created_at,
+                "url": job.url,
+                "type": job.kind
             }
-            for item in queue_manager.queue
+            for download_id, created_at, job in (_queue_fields(item) for _, _, item in queue_manager.queue)
         ]
         
         # Get active downloads
@@ -42,11 +60,13 @@ async def get_all_downloads():
             {
                 "download_id": download_id,
                 "status": "downloading",
-                "started_at": info['started_at'],
-                "url": info['request'].get('url'),
-                "type": info['request'].get('type')
+                "started_at": started_at,
+                "url": job.url,
+                "type": job.kind
             }
-            for download_id, info in queue_manager.active_downloads.items()
+            for download_id, (started_at, job) in zip(
+                queue_manager.active_downloads, map(_active_fields, queue_manager.active_downloads.values())
+            )
         ]
         
         # Get completed downloads
@@ -54,10 +74,12 @@ async def get_all_downloads():
             {
                 "download_id": download_id,
                 "status": "completed",
-                "completed_at": info['completed_at'],
-                "result": info['result']
+                "completed_at": completed_at,
+                "result": result
             }
-            for download_id, info in queue_manager.completed_downloads.items()
+            for download_id, (completed_at, result) in zip(
+                queue_manager.completed_downloads, map(_completed_fields, queue_manager.completed_downloads.values())
+            )
         ]
         
         # Get failed downloads
@@ -65,19 +87,23 @@ async def get_all_downloads():
             {
                 "download_id": download_id,
                 "status": "failed",
-                "failed_at": info['failed_at'],
-                "error": info['error']
+                "failed_at": failed_at,
+                "error": error
             }
-            for download_id, info in queue_manager.failed_downloads.items()
+            for download_id, (failed_at, error) in zip(
+                queue_manager.failed_downloads, map(_failed_fields, queue_manager.failed_downloads.values())
+            )
         ]
         
-        return {
+        body = orjson.dumps({
             "queue": queue_items,
             "active": active_downloads,
             "completed": completed_downloads,
             "failed": failed_downloads,
             "summary": queue_manager.get_queue_status()
-        }
+        })
+        _downloads_snapshot = (queue_manager.version, body)
+        return Response(content=body, media_type="application/json")
         
     except Exception as e:
         logger.error(f"Error getting all downloads: {e}")
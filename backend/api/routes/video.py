@@ -2,24 +2,29 @@
 Video download API routes
 """
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Request, Response
+from fastapi.responses import ORJSONResponse
 from typing import Dict, Any
+import hashlib
+import orjson
 import os
 import logging
 
 from core.models import VideoDownloadRequest, DownloadResponse, URLRequest, VideoInfo, FrameDownloadRequest
 from core.downloader import downloader
-from services.queue_manager import queue_manager
+from services.queue_manager import queue_manager, MergeVideoJob
 from core.config import settings
+from core.responses import etag_matches
+from services import metadata
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 logger = logging.getLogger(__name__)
 
 @router.post("/info", response_model=VideoInfo)
 async def get_video_info(request: URLRequest):
     """Get video information without downloading"""
     try:
-        info = await downloader.get_video_info(str(request.url))
+        info = await metadata.get_video_info(str(request.url))
         return info
     except Exception as e:
         logger.error(f"Error getting video info: {e}")
@@ -56,14 +61,8 @@ async def download_video(request: VideoDownloadRequest):
             })
         
         # Add to queue
-        download_request = {
-            'type': 'video_merge',
-            'url': str(request.url),
-            'options': options,
-            'priority': 1
-        }
-        
-        download_id = await queue_manager.add_to_queue(download_request)
+        job = MergeVideoJob(url=str(request.url), options=options, priority=1)
+        download_id = await queue_manager.add_to_queue(job)
         
         return DownloadResponse(
             download_id=download_id,
@@ -113,18 +112,21 @@ async def download_video_direct(request: VideoDownloadRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/formats/{video_id}")
-async def get_video_formats(video_id: str):
+async def get_video_formats(video_id: str, request: Request):
     """Get available formats for a YouTube video by ID"""
     try:
         url = f"https://www.youtube.com/watch?v={video_id}"
-        info = await downloader.get_video_info(url)
+        info = await metadata.get_video_info(url)
         
-        # Group formats by type
-        video_formats = [f for f in info.formats if f.has_video and not f.has_audio]
-        audio_formats = [f for f in info.formats if f.has_audio and not f.has_video]
-        combined_formats = [f for f in info.formats if f.has_video and f.has_audio]
+        # Group formats by type in one pass
+        video_formats, audio_formats, combined_formats = [], [], []
+        for f in info.formats:
+            if f.has_video:
+                (combined_formats if f.has_audio else video_formats).append(f.model_dump(mode="json"))
+            elif f.has_audio:
+                audio_formats.append(f.model_dump(mode="json"))
         
-        return {
+        body = orjson.dumps({
             "video_info": {
                 "title": info.title,
                 "duration": info.duration,
@@ -136,7 +138,15 @@ async def get_video_formats(video_id: str):
                 "video_only": video_formats,
                 "audio_only": audio_formats
             }
+        })
+        # Tagged from the serialized body, so any refreshed field changes the ETag
+        headers = {
+            "ETag": '"%s"' % hashlib.blake2b(body, digest_size=8).hexdigest(),
+            "Cache-Control": "private, max-age=300",
         }
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
         
     except Exception as e:
         logger.error(f"Error getting video formats: {e}")
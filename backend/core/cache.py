@@ -0,0 +1,118 @@
+"""
+In-memory caching helpers
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+from urllib.parse import urlsplit, parse_qsl, urlencode, urlunsplit
+
+YOUTUBE_HOSTS = {"youtube.com", "www.youtube.com", "m.youtube.com", "music.youtube.com"}
+# Ad click ids are dropped everywhere; the share/feature params only mean tracking on YouTube
+TRACKING_PARAMS = {"fbclid", "gclid"}
+YOUTUBE_TRACKING_PARAMS = {"si", "feature", "pp"}
+
+def normalize_url(url: str) -> str:
+    """Normalize a video URL into a cache key shared by equivalent links; fetch with the original URL"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = parts.netloc.lower()
+
+    # youtu.be/<id> -> youtube.com/watch?v=<id>
+    if host in ("youtu.be", "www.youtu.be"):
+        video_id = parts.path.lstrip("/").split("/")[0]
+        if video_id:
+            return f"https://www.youtube.com/watch?v={video_id}"
+
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key not in TRACKING_PARAMS and not key.startswith("utm_")
+    ]
+
+    if host in YOUTUBE_HOSTS:
+        # YouTube serves the same page over either scheme; other hosts keep theirs
+        scheme, host = "https", "www.youtube.com"
+        query = [(key, value) for key, value in query if key not in YOUTUBE_TRACKING_PARAMS]
+        if parts.path == "/watch":
+            # Only the video id and playlist id affect what yt-dlp extracts
+            query = [(key, value) for key, value in query if key in ("v", "list")]
+
+    return urlunsplit((scheme, host, parts.path, urlencode(sorted(query)), ""))
+
+class AsyncTTLCache:
+    """Bounded LRU cache with per-entry expiry for coroutine results"""
+
+    def __init__(self, maxsize: int = 2048, ttl: float = 600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return a cached value, or None if missing or expired"""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        """Store a value, evicting the least recently used entry if full"""
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    async def get_or_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value or await fetch(), sharing one fetch between concurrent callers"""
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        pending = self._pending.get(key)
+        while pending is not None:
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+            # The caller that owned the fetch was cancelled, not us; take over or join its successor
+            value = self.get(key)
+            if value is not None:
+                return value
+            pending = self._pending.get(key)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            value = await fetch()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        else:
+            self.set(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            self._pending.pop(key, None)
+
+    def clear(self) -> int:
+        """Drop every cached entry and return how many were removed"""
+        count = len(self._data)
+        self._data.clear()
+        return count
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -3,7 +3,9 @@ Configuration settings for the application
 """
 
 from pydantic_settings import BaseSettings
-from typing import List
+from functools import cached_property
+from pathlib import Path
+from typing import Dict, List
 import os
 
 class Settings(BaseSettings):
@@ -19,9 +21,15 @@ class Settings(BaseSettings):
     DOWNLOAD_DIR: str = "downloads"
     MAX_CONCURRENT_DOWNLOADS: int = 3
     MAX_QUEUE_SIZE: int = 100
+    PLAYLIST_RPS: float = 2.0
+    # Threads for yt-dlp lookups and downloads, sized above the download limits to leave room for lookups
+    YTDLP_WORKERS: int = 8
     
     # yt-dlp settings
+    # Player JS and signature cache; keep it on persistent storage, not /tmp
     YTDLP_CACHE_DIR: str = ".ytdlp_cache"
+    # Extracted once at startup to fill the player/signature cache; empty (the default) skips the warm-up
+    YTDLP_WARMUP_URL: str = ""
     YTDLP_COOKIES_FILE: str = ""
     YTDLP_USER_AGENT: str = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
     
@@ -36,7 +44,28 @@ class Settings(BaseSettings):
         env_file = ".env"
         case_sensitive = True
 
-# Create downloads directory
+    @cached_property
+    def download_path(self) -> Path:
+        """Absolute, symlink-resolved DOWNLOAD_DIR, computed once"""
+        return Path(self.DOWNLOAD_DIR).resolve()
+
+def server_loop_options() -> Dict[str, str]:
+    """Pick uvloop and httptools for uvicorn when installed, else the pure-Python fallbacks"""
+    try:
+        import uvloop  # noqa: F401
+        loop = "uvloop"
+    except ImportError:
+        loop = "asyncio"  # uvloop does not support Windows
+
+    try:
+        import httptools  # noqa: F401
+        http = "httptools"
+    except ImportError:
+        http = "h11"
+
+    return {"loop": loop, "http": http}
+
+# Create downloads directory; called from the app lifespan rather than at import
 def ensure_directories():
     dirs = [
         settings.DOWNLOAD_DIR,
@@ -46,5 +75,4 @@ def ensure_directories():
     for dir_path in dirs:
         os.makedirs(dir_path, exist_ok=True)
 
-settings = Settings()
-ensure_directories()
\ No newline at end of file
+settings = Settings()
\ No newline at end of file
@@ -2,19 +2,75 @@
 Database models and operations
 """
 
-from sqlalchemy import create_engine, Column, String, Integer, Float, DateTime, Text, Boolean
+from sqlalchemy import create_engine, event, Column, String, Integer, Float, DateTime, Text, Boolean
+from sqlalchemy.types import TypeDecorator
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.sql import func
 from datetime import datetime
-import json
+from typing import Any, Optional
+import orjson
 
 from core.config import settings
 
-engine = create_engine(settings.DATABASE_URL, connect_args={"check_same_thread": False})
+database_url = make_url(settings.DATABASE_URL)
+is_sqlite_file = database_url.get_backend_name() == "sqlite" and database_url.database not in (None, "", ":memory:")
+
+# SQLite allows one writer at a time, so writes share a single connection. Routes don't write
+# directly; records go through the m3u8 record-writer thread. pool_timeout matches busy_timeout
+# so any other writer waits for the connection the way SQLite would wait for the lock
+engine = create_engine(
+    settings.DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    **({"pool_size": 1, "max_overflow": 0, "pool_timeout": 30} if is_sqlite_file else {})
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Under WAL, read-only connections run alongside the writer without blocking it
+if is_sqlite_file:
+    read_engine = create_engine(
+        f"sqlite:///file:{database_url.database}?mode=ro&uri=true",
+        connect_args={"check_same_thread": False},
+        pool_size=8
+    )
+else:
+    read_engine = engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+def _set_pragmas(dbapi_connection, pragmas):
+    """Run PRAGMA statements on a new DBAPI connection"""
+    cursor = dbapi_connection.cursor()
+    for pragma in pragmas:
+        cursor.execute(f"PRAGMA {pragma}")
+    cursor.close()
+
+if is_sqlite_file:
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL lets other workers read progress while a download is writing it;
+        # busy_timeout makes concurrent writers wait instead of failing with "database is locked"
+        _set_pragmas(dbapi_connection, (
+            "journal_mode=WAL", "synchronous=NORMAL", "busy_timeout=30000",
+            "temp_store=MEMORY", "cache_size=-64000",
+        ))
+
+    @event.listens_for(read_engine, "connect")
+    def _set_sqlite_read_pragmas(dbapi_connection, connection_record):
+        _set_pragmas(dbapi_connection, ("busy_timeout=30000", "temp_store=MEMORY", "cache_size=-64000"))
+
+class JSONText(TypeDecorator):
+    """Text column holding JSON, (de)serialized with orjson"""
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else orjson.dumps(value).decode()
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else orjson.loads(value)
+
 class DownloadRecord(Base):
     __tablename__ = "downloads"
     
@@ -28,7 +84,7 @@ class DownloadRecord(Base):
     file_path = Column(String)
     file_size = Column(Integer)
     error_message = Column(Text)
-    options = Column(Text)  # JSON string of download options
+    options = Column(JSONText)  # Download options, stored as a JSON string
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     completed_at = Column(DateTime)
@@ -52,4 +108,28 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_read_db():
+    """Get a database session on the read-only engine"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def save_download_record(download_id: str, **fields: Any):
+    """Insert or update the download record with the given id"""
+    with SessionLocal() as db:
+        record = db.get(DownloadRecord, download_id)
+        if record is None:
+            db.add(DownloadRecord(id=download_id, **fields))
+        else:
+            for key, value in fields.items():
+                setattr(record, key, value)
+        db.commit()
+
+def get_download_record(download_id: str) -> Optional[DownloadRecord]:
+    """Fetch a download record by id"""
+    with ReadSessionLocal() as db:
+        return db.get(DownloadRecord, download_id)
@@ -4,29 +4,94 @@ Advanced yt-dlp wrapper with enhanced features
 
 import yt_dlp
 import asyncio
+import copy
 import os
 import uuid
 import re
-import subprocess
-import signal
 import time
-import gc
-from typing import Dict, Any, Optional, Callable, List
+import shutil
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from operator import attrgetter
+from typing import Dict, Any, Optional, Callable, List, Tuple
 from pathlib import Path
 import json
 import logging
 
+try:
+    import psutil
+except ImportError:  # Optional; /proc/meminfo is read instead on Linux
+    psutil = None
+
 from core.config import settings
+from core.registry import DownloadRegistry
+from core.cache import AsyncTTLCache, normalize_url
 from core.models import DownloadMode, DownloadStatus, DownloadProgress, VideoInfo, FormatInfo, FrameInfo, PlaylistInfo, SponsorBlockMusicRequest
 
 logger = logging.getLogger(__name__)
 
+# YoutubeDL instances kept per executor thread
+YDL_POOL_SIZE = 8
+
+# Raw extraction results kept so a download right after a preview skips re-extraction.
+# Signed stream URLs can expire or be rejected early, so reuse is limited to a short window
+RAW_INFO_CACHE_SIZE = 128
+RAW_INFO_CACHE_TTL = 120
+
+# Browser user agent sent with every yt-dlp request
+BROWSER_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# Seconds an extraction strategy runs alone before the next one is started beside it
+STRATEGY_HEDGE_DELAY = 5.0
+# Threads for fallback strategies, kept apart so losing hedges can't occupy the main yt-dlp pool
+HEDGE_WORKERS = 2
+
+# Downloads are refused below these free memory / disk space levels
+MIN_AVAILABLE_MEMORY_MB = 500
+MIN_FREE_DISK_MB = 1024
+
+# Minimum seconds between 'downloading' progress callbacks for one download
+PROGRESS_HOOK_INTERVAL = 0.25
+
+# Per-mode extras on top of the shared merge options
+MERGE_EXTRA_OPTS = {
+    'writesubtitles': False,  # Don't download subtitles unless requested
+    # FFmpeg muxing options; streams are copied into mp4, never re-encoded
+    'postprocessor_args': {
+        'ffmpeg': [
+            '-c:v', 'copy',
+            '-c:a', 'copy',
+            '-movflags', '+faststart',  # Optimize for streaming
+            '-avoid_negative_ts', 'make_zero',  # Fix timestamp issues
+            '-max_muxing_queue_size', '1024',  # Limit muxing queue
+            '-fflags', '+genpts+igndts',  # Generate PTS and ignore DTS
+        ]
+    },
+}
+FRAME_EXTRA_OPTS = {
+    'concurrent_fragment_downloads': 1,  # Single thread for stability
+    # Safe FFmpeg options; streams are copied, never re-encoded
+    'postprocessor_args': {
+        'ffmpeg': [
+            '-c:v', 'copy',
+            '-c:a', 'copy',
+            '-avoid_negative_ts', 'make_zero',
+            '-max_muxing_queue_size', '512',  # Smaller queue for frames
+            '-movflags', '+faststart',
+        ]
+    },
+}
+
+# Anything but word characters, whitespace, dots and dashes; this also covers <>:"/\|?*
+UNSAFE_FILENAME_CHARS = re.compile(r'[^\w\s.-]')
+WHITESPACE_RUNS = re.compile(r'\s+')
+
 def clean_filename(filename: str, max_length: int = 100) -> str:
     """Clean filename by removing special characters and limiting length"""
     # Remove or replace problematic characters
-    cleaned = re.sub(r'[<>:"/\\|?*]', '', filename)
-    cleaned = re.sub(r'[^\w\s-.]', '', cleaned)
-    cleaned = re.sub(r'\s+', ' ', cleaned).strip()
+    cleaned = UNSAFE_FILENAME_CHARS.sub('', filename)
+    cleaned = WHITESPACE_RUNS.sub(' ', cleaned).strip()
     
     # Limit length
     if len(cleaned) > max_length:
@@ -35,15 +100,148 @@ def clean_filename(filename: str, max_length: int = 100) -> str:
     
     return cleaned
 
+def _discard_outcome(future: asyncio.Future) -> None:
+    """Mark a future's exception as retrieved when nobody else will read it"""
+    if not future.cancelled():
+        future.exception()
+
 class AdvancedDownloader:
     def __init__(self):
-        self.active_downloads: Dict[str, Dict] = {}
+        # Finished entries stay pollable for 10 minutes, and the registry never grows past 1000
+        self.active_downloads = DownloadRegistry(maxsize=1000, finished_ttl=600)
         self.progress_callbacks: Dict[str, Callable] = {}
-        self.ffmpeg_processes: Dict[str, subprocess.Popen] = {}
-        self.max_concurrent_downloads = 2  # Limit concurrent downloads
+        # download_id -> flag the running yt-dlp thread checks on every progress tick
+        self._cancel_events: Dict[str, threading.Event] = {}
+        self.max_concurrent_downloads = settings.MAX_CONCURRENT_DOWNLOADS  # Limit concurrent downloads
+        # Shared by every download entry point, so excess callers queue instead of erroring
+        self._download_slots = asyncio.Semaphore(self.max_concurrent_downloads)
+        # yt-dlp work gets its own threads so long downloads can't starve the default executor;
+        # at least one thread stays free for info lookups even with every download slot busy
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(settings.YTDLP_WORKERS, self.max_concurrent_downloads + 1),
+            thread_name_prefix="ytdlp"
+        )
+        # Strategies after the first run here; a stalled or losing hedge only ties up these threads
+        self._hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="ytdlp-hedge")
+        # Per-thread YoutubeDL pools keyed by option set; a thread runs one extraction at a time
+        self._ydl_local = threading.local()
+        # Normalized URL -> raw yt-dlp info dict from get_video_info
+        self._info_cache = AsyncTTLCache(maxsize=RAW_INFO_CACHE_SIZE, ttl=RAW_INFO_CACHE_TTL)
+        
+    def _ydl(self, ydl_opts: Dict[str, Any]) -> Tuple[yt_dlp.YoutubeDL, bool]:
+        """This thread's cached YoutubeDL for ydl_opts, keeping extractors and connections warm; also returns whether it is pooled"""
+        pool = getattr(self._ydl_local, 'pool', None)
+        if pool is None:
+            pool = self._ydl_local.pool = OrderedDict()
+        
+        # Values without a JSON form (callables, objects) only repr by identity,
+        # so they would never hit the pool and would just evict warm instances
+        unstable = []
+        def key_default(value):
+            unstable.append(value)
+            return repr(value)
+        key = json.dumps(ydl_opts, sort_keys=True, default=key_default)
         
+        # Progress goes through the thread's current hook, so instances outlive their callers
+        if unstable:
+            return yt_dlp.YoutubeDL({**ydl_opts, 'progress_hooks': [self._thread_progress_hook]}), False
+        
+        ydl = pool.get(key)
+        if ydl is None:
+            ydl = yt_dlp.YoutubeDL({**ydl_opts, 'progress_hooks': [self._thread_progress_hook]})
+            pool[key] = ydl
+            if len(pool) > YDL_POOL_SIZE:
+                pool.popitem(last=False)[1].close()
+        else:
+            pool.move_to_end(key)
+        return ydl, True
+    
+    def _thread_progress_hook(self, d):
+        """Forward yt-dlp progress to the hook of the call running on this thread, aborting if it was cancelled"""
+        cancel_event = getattr(self._ydl_local, 'cancel_event', None)
+        if cancel_event is not None and cancel_event.is_set():
+            # DownloadCancelled is re-raised by yt-dlp even with ignoreerrors set
+            raise yt_dlp.utils.DownloadCancelled()
+        hook = getattr(self._ydl_local, 'progress_hook', None)
+        if hook is not None:
+            hook(d)
+    
+    def _run_ydl(self, ydl_opts: Dict[str, Any], url: str, download: bool = False,
+                 progress_hook: Optional[Callable] = None,
+                 cached_info: Optional[Dict] = None,
+                 cancel_event: Optional[threading.Event] = None) -> Tuple[Optional[Dict], Optional[str]]:
+        """Run extract_info on a pooled YoutubeDL, returning the info and, for downloads, the output filename"""
+        ydl, pooled = self._ydl(ydl_opts)
+        self._ydl_local.progress_hook = progress_hook
+        self._ydl_local.cancel_event = cancel_event
+        try:
+            info = None
+            if cached_info is not None:
+                # Reprocess an earlier extraction on a deep copy, so the cached dict keeps every
+                # field and is never mutated. With ignoreerrors off, a rejected stream URL
+                # (HTTP 403) raises here instead of being logged, and we re-extract below
+                ignoreerrors = ydl.params.get('ignoreerrors')
+                ydl.params['ignoreerrors'] = False
+                try:
+                    info = ydl.process_ie_result(copy.deepcopy(cached_info), download=download)
+                except yt_dlp.utils.DownloadCancelled:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Cached info for {url} failed, re-extracting: {e}")
+                    info = None
+                finally:
+                    ydl.params['ignoreerrors'] = ignoreerrors
+            if info is None:
+                info = ydl.extract_info(url, download=download)
+            return info, ydl.prepare_filename(info) if info and download else None
+        finally:
+            self._ydl_local.progress_hook = None
+            self._ydl_local.cancel_event = None
+            if not pooled:
+                ydl.close()
+    
+    def _run_strategy(self, settled: threading.Event, ydl_opts: Dict[str, Any], url: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """Run one extraction strategy, unless the lookup already settled while it was queued"""
+        if settled.is_set():
+            return None, None
+        return self._run_ydl(ydl_opts, url)
+    
+    def _final_output(self, filename: str, ext: str, missing_error: Optional[str] = None, min_size: int = 0) -> str:
+        """Prefer the post-processed <name>.<ext> over the raw download and sanity-check its size"""
+        for candidate in (f"{os.path.splitext(filename)[0]}.{ext}", filename):
+            try:
+                size = os.stat(candidate).st_size
+            except FileNotFoundError:
+                continue
+            if size < min_size:
+                raise Exception("Downloaded file appears to be corrupted (too small)")
+            return candidate
+        
+        if missing_error:
+            raise Exception(missing_error)
+        return filename
+    
+    def get_info_options(self) -> Dict[str, Any]:
+        """Minimal yt-dlp options for metadata extraction, without download/merge settings"""
+        return {
+            'quiet': True,
+            'skip_download': True,
+            'ignoreerrors': True,
+            'cachedir': settings.YTDLP_CACHE_DIR,
+            'extractor_retries': 3,
+            'socket_timeout': 60,
+            'extractor_args': {
+                'youtube': {
+                    'player_client': ['android', 'web'],
+                    'player_skip': ['webpage'],
+                }
+            },
+            # Same browser user agent as downloads; yt-dlp's defaults cover the other headers
+            'http_headers': {'User-Agent': BROWSER_USER_AGENT},
+        }
+    
     def get_base_options(self) -> Dict[str, Any]:
-        """Get base yt-dlp options with YouTube anti-bot measures"""
+        """Get base yt-dlp download options with YouTube anti-bot measures"""
         return {
             'outtmpl': os.path.join(settings.DOWNLOAD_DIR, '%(title).100s.%(ext)s'),
             'restrictfilenames': True,
@@ -72,7 +270,7 @@ class AdvancedDownloader:
             },
             # Add user agent and headers to appear more like a real browser
             'http_headers': {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                'User-Agent': BROWSER_USER_AGENT,
                 'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
                 'Accept-Language': 'en-us,en;q=0.5',
                 'Accept-Encoding': 'gzip,deflate',
@@ -83,9 +281,18 @@ class AdvancedDownloader:
     
     def create_progress_hook(self, download_id: str, callback: Optional[Callable] = None):
         """Create progress hook for yt-dlp"""
+        last_emit = 0.0
+        
         def progress_hook(d):
+            nonlocal last_emit
             try:
                 if d['status'] == 'downloading':
+                    # yt-dlp ticks many times a second; status changes always go through
+                    now = time.monotonic()
+                    if now - last_emit < PROGRESS_HOOK_INTERVAL:
+                        return
+                    last_emit = now
+                    
                     progress = 0.0
                     if d.get('total_bytes'):
                         progress = (d.get('downloaded_bytes', 0) / d['total_bytes']) * 100
@@ -122,7 +329,7 @@ class AdvancedDownloader:
                 
         return progress_hook
     
-    async def get_video_info(self, url: str) -> VideoInfo:
+    async def get_video_info(self, url: str, *, include_frames: bool = True) -> VideoInfo:
         """Extract video information without downloading with multiple fallback strategies"""
         # Try multiple extraction strategies with anti-bot measures
         strategies = [
@@ -167,96 +374,143 @@ class AdvancedDownloader:
             }
         ]
         
-        last_error = None
+        loop = asyncio.get_running_loop()
+        attempts: Dict[asyncio.Future, int] = {}
+        pending = set()
+        remaining = iter(enumerate(strategies))
+        # Set once a strategy wins or the lookup is abandoned; queued hedges then skip extraction
+        settled = threading.Event()
         
-        for i, strategy in enumerate(strategies):
-            try:
-                ydl_opts = self.get_base_options()
+        def launch_next() -> bool:
+            """Start the next strategy, if any are left; fallbacks go to the hedge pool"""
+            for i, strategy in remaining:
+                ydl_opts = self.get_info_options()
                 ydl_opts.update(strategy)
-                
-                logger.info(f"Trying extraction strategy {i+1}/3 for URL: {url}")
-                
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    info = await asyncio.get_event_loop().run_in_executor(
-                        None, lambda: ydl.extract_info(url, download=False)
-                    )
-                    
-                    if not info:
-                        raise Exception("Failed to extract video information")
-                    
+                logger.info(f"Trying extraction strategy {i+1}/{len(strategies)} for URL: {url}")
+                executor = self._executor if i == 0 else self._hedge_executor
+                future = loop.run_in_executor(executor, self._run_strategy, settled, ydl_opts, url)
+                attempts[future] = i
+                # Losers and abandoned hedges are never awaited; read their outcome so it isn't logged as unretrieved
+                future.add_done_callback(_discard_outcome)
+                pending.add(future)
+                return True
+            return False
+        
+        # Hedged: a strategy that fails or stalls past STRATEGY_HEDGE_DELAY gets the next
+        # client started alongside it, and the first success wins
+        info = None
+        won = None
+        last_error = None
+        has_more = launch_next()
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending, timeout=STRATEGY_HEDGE_DELAY if has_more else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                for future in done:
+                    pending.discard(future)
+                    i = attempts[future]
+                    try:
+                        result, _ = future.result()
+                        if not result:
+                            raise Exception("Failed to extract video information")
+                    except Exception as e:
+                        last_error = e
+                        logger.warning(f"Strategy {i+1} failed: {str(e)}")
+                        continue
+                    info = result
+                    won = i
                     logger.info(f"Successfully extracted info using strategy {i+1}")
                     break
-                    
-            except Exception as e:
-                last_error = e
-                logger.warning(f"Strategy {i+1} failed: {str(e)}")
-                if i < len(strategies) - 1:
-                    continue
-                else:
-                    # All strategies failed
-                    error_msg = f"All extraction strategies failed. Last error: {str(last_error)}"
-                    if "Failed to extract any player response" in str(last_error):
-                        error_msg += "\n\nThis is likely due to YouTube changes. Try updating yt-dlp with: pip install --upgrade yt-dlp"
-                    raise Exception(error_msg)
+                
+                if info is not None:
+                    break
+                if has_more:
+                    has_more = launch_next()
+        finally:
+            # Queued strategies are dropped; running ones finish in their thread and are ignored
+            settled.set()
+            for future in pending:
+                future.cancel()
+        
+        if info is None:
+            # All strategies failed
+            error_msg = f"All extraction strategies failed. Last error: {str(last_error)}"
+            if "Failed to extract any player response" in str(last_error):
+                error_msg += "\n\nThis is likely due to YouTube changes. Try updating yt-dlp with: pip install --upgrade yt-dlp"
+            raise Exception(error_msg)
+        
+        # Single, finished videos can be downloaded later straight from this result; only the first
+        # strategy keeps DASH, so a fallback's progressive-only formats would silently downgrade merges
+        if won == 0 and info.get('_type', 'video') == 'video' and not info.get('is_live'):
+            self._info_cache.set(normalize_url(url), info)
         
         try:
             # Process formats
             formats = []
             frames = []
             
-            for f in info.get('formats', []):
-                format_info = FormatInfo(
-                    format_id=f.get('format_id', ''),
-                    ext=f.get('ext', ''),
-                    resolution=f.get('resolution'),
-                    fps=f.get('fps'),
-                    vcodec=f.get('vcodec'),
-                    acodec=f.get('acodec'),
-                    filesize=f.get('filesize'),
-                    filesize_approx=f.get('filesize_approx'),
-                    tbr=f.get('tbr'),
-                    vbr=f.get('vbr'),
-                    abr=f.get('abr'),
-                    format_note=f.get('format_note'),
-                    quality=f.get('quality'),
-                    has_video=f.get('vcodec', 'none') != 'none',
-                    has_audio=f.get('acodec', 'none') != 'none'
-                )
-                formats.append(format_info)
+            for f in info.get('formats') or ():
+                # Read each field once; yt-dlp formats carry 20+ keys
+                get = f.get
+                format_id = get('format_id', '')
+                resolution = get('resolution')
+                fps = get('fps')
+                vcodec = get('vcodec')
+                acodec = get('acodec')
+                filesize = get('filesize')
+                filesize_approx = get('filesize_approx')
+                tbr = get('tbr')
+                vbr = get('vbr')
+                abr = get('abr')
+                has_video = 'vcodec' in f and vcodec != 'none'
+                has_audio = 'acodec' in f and acodec != 'none'
+                
+                # yt-dlp has already normalized these types, so skip pydantic validation
+                formats.append(FormatInfo.model_construct(
+                    format_id=format_id,
+                    ext=get('ext', ''),
+                    resolution=resolution,
+                    fps=fps,
+                    vcodec=vcodec,
+                    acodec=acodec,
+                    filesize=filesize,
+                    filesize_approx=filesize_approx,
+                    tbr=tbr,
+                    vbr=vbr,
+                    abr=abr,
+                    format_note=get('format_note'),
+                    quality=get('quality'),
+                    has_video=has_video,
+                    has_audio=has_audio
+                ))
                 
                 # Create frame info for video formats
-                if f.get('vcodec', 'none') != 'none' and f.get('resolution'):
-                    filesize_mb = None
-                    if f.get('filesize'):
-                        filesize_mb = round(f.get('filesize') / (1024 * 1024), 1)
-                    elif f.get('filesize_approx'):
-                        filesize_mb = round(f.get('filesize_approx') / (1024 * 1024), 1)
+                if include_frames and has_video and resolution:
+                    size = filesize or filesize_approx
+                    filesize_mb = round(size / (1024 * 1024), 1) if size else None
                     
                     # Calculate quality score based on resolution and bitrate
-                    quality_score = 0
-                    if f.get('height'):
-                        quality_score += f.get('height', 0) * 0.1
-                    if f.get('tbr'):
-                        quality_score += f.get('tbr', 0) * 0.01
+                    quality_score = (get('height') or 0) * 0.1 + (tbr or 0) * 0.01
                     
-                    frame_info = FrameInfo(
-                        format_id=f.get('format_id', ''),
-                        resolution=f.get('resolution', 'Unknown'),
-                        fps=f.get('fps'),
-                        codec=f.get('vcodec', 'Unknown'),
-                        container=f.get('ext', 'Unknown'),
-                        bitrate=f.get('vbr') or f.get('tbr'),
-                        filesize=f.get('filesize') or f.get('filesize_approx'),
+                    frames.append(FrameInfo.model_construct(
+                        format_id=format_id,
+                        resolution=resolution,
+                        fps=fps,
+                        codec=vcodec,
+                        container=get('ext', 'Unknown'),
+                        bitrate=vbr or tbr,
+                        filesize=size,
                         filesize_mb=filesize_mb,
                         quality_score=quality_score,
-                        has_audio=f.get('acodec', 'none') != 'none',
-                        audio_codec=f.get('acodec') if f.get('acodec', 'none') != 'none' else None,
-                        audio_bitrate=f.get('abr')
-                    )
-                    frames.append(frame_info)
+                        has_audio=has_audio,
+                        audio_codec=acodec if has_audio else None,
+                        audio_bitrate=abr
+                    ))
             
             # Sort frames by quality score (highest first)
-            frames.sort(key=lambda x: x.quality_score or 0, reverse=True)
+            frames.sort(key=attrgetter('quality_score'), reverse=True)
             
             return VideoInfo(
                 id=info.get('id', ''),
@@ -281,96 +535,148 @@ class AdvancedDownloader:
     
     async def get_playlist_info(self, url: str) -> PlaylistInfo:
         """Extract playlist information"""
-        ydl_opts = self.get_base_options()
-        ydl_opts.update({
-            'quiet': True,
-            'extract_flat': True,
-            'skip_download': True,
-        })
+        ydl_opts = self.get_info_options()
+        ydl_opts['extract_flat'] = True
         
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = await asyncio.get_event_loop().run_in_executor(
-                    None, lambda: ydl.extract_info(url, download=False)
-                )
-                
-                if not info:
-                    raise Exception("Failed to extract playlist information")
-                
-                videos = []
-                for idx, entry in enumerate(info.get('entries', []), 1):
-                    if entry:
-                        videos.append({
-                            'id': entry.get('id', ''),
-                            'title': entry.get('title', f'Video {idx}'),
-                            'duration': entry.get('duration'),
-                            'uploader': entry.get('uploader'),
-                            'index': idx
-                        })
-                
-                return PlaylistInfo(
-                    id=info.get('id', ''),
-                    title=info.get('title', ''),
-                    description=info.get('description'),
-                    uploader=info.get('uploader'),
-                    video_count=len(videos),
-                    videos=videos
-                )
+            info, _ = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._run_ydl, ydl_opts, url
+            )
+            
+            if not info:
+                raise Exception("Failed to extract playlist information")
+            
+            videos = []
+            for idx, entry in enumerate(info.get('entries', []), 1):
+                if entry:
+                    videos.append({
+                        'id': entry.get('id', ''),
+                        'title': entry.get('title', f'Video {idx}'),
+                        'duration': entry.get('duration'),
+                        'uploader': entry.get('uploader'),
+                        'index': idx
+                    })
+            
+            return PlaylistInfo(
+                id=info.get('id', ''),
+                title=info.get('title', ''),
+                description=info.get('description'),
+                uploader=info.get('uploader'),
+                video_count=len(videos),
+                videos=videos
+            )
                 
         except Exception as e:
             logger.error(f"Error extracting playlist info: {e}")
             raise Exception(f"Failed to get playlist information: {str(e)}")
     
-    async def download_video(self, url: str, options: Dict[str, Any], 
-                           progress_callback: Optional[Callable] = None) -> str:
-        """Download video with custom options"""
+    async def _run_download(self, url: str, ydl_opts: Dict[str, Any], progress_callback: Optional[Callable],
+                            error_label: str, output_ext: Optional[str] = None, missing_error: Optional[str] = None,
+                            min_size: int = 0, timeout: Optional[float] = None, guarded: bool = False,
+                            **status: Any) -> str:
+        """Run one yt-dlp download with status bookkeeping and return the final output path"""
         download_id = str(uuid.uuid4())
+        # Without a callback the hook would only parse progress to throw it away
+        progress_hook = None
+        if progress_callback is not None:
+            progress_hook = self.create_progress_hook(download_id, progress_callback)
         
-        ydl_opts = self.get_base_options()
-        ydl_opts.update(options)
-        ydl_opts['progress_hooks'] = [self.create_progress_hook(download_id, progress_callback)]
+        entry = {
+            'status': DownloadStatus.DOWNLOADING,
+            'url': url,
+            **status
+        }
+        cancel_event = threading.Event()
         
         try:
-            self.active_downloads[download_id] = {
-                'status': DownloadStatus.DOWNLOADING,
-                'url': url,
-                'options': options
-            }
+            # Waiting for a slot is backpressure, not failure; the timeout only covers the download itself
+            async with self._download_slots:
+                if guarded:
+                    # Check system resources before starting
+                    if not self._check_system_resources():
+                        raise Exception("Insufficient system resources for download")
+            
+                self.active_downloads.add(download_id, entry)
+                self._cancel_events[download_id] = cancel_event
             
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = await asyncio.get_event_loop().run_in_executor(
-                    None, lambda: ydl.extract_info(url, download=True)
+                future = asyncio.get_running_loop().run_in_executor(
+                    self._executor, self._run_ydl, ydl_opts, url, True, progress_hook,
+                    self._info_cache.get(normalize_url(url)), cancel_event
                 )
-                
+                # The slot stays held until the thread has really stopped; timing out or being
+                # cancelled only flags it, and the progress hook aborts on its next tick
+                try:
+                    done, _ = await asyncio.wait({future}, timeout=timeout)
+                except asyncio.CancelledError:
+                    await self._abort_download(future, cancel_event)
+                    raise
+                if not done:
+                    await self._abort_download(future, cancel_event)
+                    raise Exception(f"Download timed out after {timeout / 60:.0f} minutes")
+                info, filename = future.result()
+            
                 if not info:
                     raise Exception("Download failed - no info returned")
-                
-                filename = ydl.prepare_filename(info)
-                
-                # Handle merged output filename
-                if 'merge_output_format' in ydl_opts and ydl_opts['merge_output_format']:
-                    # yt-dlp automatically merges and creates the final file
-                    base_name = os.path.splitext(filename)[0]
-                    merged_filename = f"{base_name}.{ydl_opts['merge_output_format']}"
-                    if os.path.exists(merged_filename):
-                        filename = merged_filename
-                
-                self.active_downloads[download_id]['status'] = DownloadStatus.COMPLETED
-                self.active_downloads[download_id]['filename'] = filename
-                
+            
+                # Pick the merged/post-processed output over the raw download
+                if output_ext:
+                    filename = await asyncio.to_thread(self._final_output, filename, output_ext, missing_error, min_size)
+            
+                entry['status'] = DownloadStatus.COMPLETED
+                entry['filename'] = filename
+            
                 return filename
-                
+            
         except Exception as e:
-            logger.error(f"Download error: {e}")
-            self.active_downloads[download_id]['status'] = DownloadStatus.FAILED
-            self.active_downloads[download_id]['error'] = str(e)
-            raise Exception(f"Download failed: {str(e)}")
+            logger.error(f"{error_label} error: {e}")
+            if entry['status'] != DownloadStatus.CANCELLED:
+                entry['status'] = DownloadStatus.FAILED
+            entry['error'] = str(e)
+            
+            raise Exception(f"{error_label} failed: {str(e)}")
+        finally:
+            self._cancel_events.pop(download_id, None)
+            self.active_downloads.finish(download_id)
+    
+    async def _abort_download(self, future: asyncio.Future, cancel_event: threading.Event):
+        """Flag a running download to stop and wait until its yt-dlp thread has exited"""
+        cancel_event.set()
+        await asyncio.wait({future})
+        if not future.cancelled():
+            future.exception()  # Retrieved, so asyncio doesn't log it as unhandled
+    
+    def _build_merge_opts(self, format_selector: str, extra: Dict[str, Any]) -> Dict[str, Any]:
+        """Options for a video+audio download merged into mp4, plus per-mode extras"""
+        ydl_opts = self.get_base_options()
+        ydl_opts.update({
+            'format': format_selector,
+            'merge_output_format': 'mp4',
+            'prefer_ffmpeg': True,
+            'keepvideo': False,  # Don't keep separate files
+            'outtmpl': os.path.join(settings.DOWNLOAD_DIR, '%(title).100s.%(ext)s'),
+            'restrictfilenames': True,
+            'windowsfilenames': True,  # Ensure Windows compatibility
+            # Don't write info files or thumbnails to save space
+            'writeinfojson': False,
+            'writethumbnail': False,
+        })
+        ydl_opts.update(copy.deepcopy(extra))
+        return ydl_opts
+    
+    async def download_video(self, url: str, options: Dict[str, Any], 
+                           progress_callback: Optional[Callable] = None) -> str:
+        """Download video with custom options"""
+        ydl_opts = self.get_base_options()
+        ydl_opts.update(options)
+        # yt-dlp merges into merge_output_format when one is set
+        return await self._run_download(
+            url, ydl_opts, progress_callback, "Download",
+            output_ext=ydl_opts.get('merge_output_format'), options=options
+        )
     
     async def download_video_with_merge(self, url: str, quality: str = "best",
                                       progress_callback: Optional[Callable] = None) -> str:
         """Download video with automatic video+audio merging for high quality - crash-safe version"""
-        download_id = str(uuid.uuid4())
-
         # Determine format selector based on quality with fallbacks
         if quality == "best":
             # Use progressive formats first, then fallback to adaptive
@@ -382,103 +688,28 @@ class AdvancedDownloader:
         else:
             format_selector = quality
         
-        ydl_opts = self.get_base_options()
-        ydl_opts.update({
-            'format': format_selector,
-            'merge_output_format': 'mp4',
-            'prefer_ffmpeg': True,
-            'keepvideo': False,  # Don't keep separate files
-            'outtmpl': os.path.join(settings.DOWNLOAD_DIR, '%(title).100s.%(ext)s'),
-            'restrictfilenames': True,
-            'windowsfilenames': True,  # Ensure Windows compatibility
-            # Additional crash prevention options
-            'writeinfojson': False,  # Don't write info files to save space
-            'writethumbnail': False,  # Don't download thumbnails
-            'writesubtitles': False,  # Don't download subtitles unless requested
-            # FFmpeg-specific options for stability
-            'postprocessor_args': {
-                'ffmpeg': [
-                    '-threads', '2',  # Limit threads to prevent CPU overload
-                    '-preset', 'fast',  # Fast encoding preset
-                    '-crf', '23',  # Reasonable quality/size balance
-                    '-maxrate', '10M',  # Limit bitrate to prevent memory issues
-                    '-bufsize', '20M',  # Buffer size for rate control
-                    '-movflags', '+faststart',  # Optimize for streaming
-                    '-avoid_negative_ts', 'make_zero',  # Fix timestamp issues
-                    '-max_muxing_queue_size', '1024',  # Limit muxing queue
-                    '-fflags', '+genpts+igndts',  # Generate PTS and ignore DTS
-                ]
-            },
-        })
-        ydl_opts['progress_hooks'] = [self.create_progress_hook(download_id, progress_callback)]
-        
+        ydl_opts = self._build_merge_opts(format_selector, MERGE_EXTRA_OPTS)
+        # The raw file may already be mp4; 30 minute timeout for large downloads
+        return await self._run_download(
+            url, ydl_opts, progress_callback, "Video download with merge",
+            output_ext="mp4", missing_error="Merged file not found after download", min_size=1024,
+            timeout=1800, guarded=True, format=format_selector, start_time=time.time()
+        )
+    
+    async def warm_up(self):
+        """Extract one known video so the player JS and signature caches are filled before real requests"""
+        if not settings.YTDLP_WARMUP_URL:
+            return
         try:
-            # Check system resources before starting
-            if not self._check_system_resources():
-                raise Exception("Insufficient system resources for download")
-            
-            # Clean up any hanging processes
-            self._cleanup_processes()
-            
-            self.active_downloads[download_id] = {
-                'status': DownloadStatus.DOWNLOADING,
-                'url': url,
-                'format': format_selector,
-                'start_time': time.time()
-            }
-            
-            # Use a timeout for the download operation
-            try:
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    # Set a reasonable timeout for large downloads (30 minutes)
-                    info = await asyncio.wait_for(
-                        asyncio.get_event_loop().run_in_executor(
-                            None, lambda: ydl.extract_info(url, download=True)
-                        ),
-                        timeout=1800  # 30 minutes timeout
-                    )
-                    
-                    if not info:
-                        raise Exception("Download failed - no info returned")
-                    
-                    # Get the final merged filename
-                    filename = ydl.prepare_filename(info)
-                    base_name = os.path.splitext(filename)[0]
-                    final_filename = f"{base_name}.mp4"
-                    
-                    # Check if merged file exists
-                    if os.path.exists(final_filename):
-                        filename = final_filename
-                    elif os.path.exists(filename):
-                        # File might already be in correct format
-                        pass
-                    else:
-                        raise Exception("Merged file not found after download")
-                    
-                    # Verify file is not corrupted
-                    if os.path.getsize(filename) < 1024:  # Less than 1KB
-                        raise Exception("Downloaded file appears to be corrupted (too small)")
-                    
-                    self.active_downloads[download_id]['status'] = DownloadStatus.COMPLETED
-                    self.active_downloads[download_id]['filename'] = filename
-                    
-                    # Clean up after successful download
-                    self._cleanup_processes()
-                    
-                    return filename
-                    
-            except asyncio.TimeoutError:
-                raise Exception("Download timed out after 30 minutes")
-                
+            await self.get_video_info(settings.YTDLP_WARMUP_URL, include_frames=False)
+            logger.info("yt-dlp warm-up extraction finished")
         except Exception as e:
-            logger.error(f"Video merge download error: {e}")
-            self.active_downloads[download_id]['status'] = DownloadStatus.FAILED
-            self.active_downloads[download_id]['error'] = str(e)
-            
-            # Clean up on error
-            self._cleanup_processes()
-            
-            raise Exception(f"Video download with merge failed: {str(e)}")
+            logger.warning(f"yt-dlp warm-up extraction failed: {e}")
+    
+    def shutdown(self):
+        """Stop the yt-dlp worker threads, dropping work that hasn't started"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._hedge_executor.shutdown(wait=False, cancel_futures=True)
     
     def get_download_status(self, download_id: str) -> Optional[Dict]:
         """Get download status by ID"""
@@ -488,118 +719,41 @@ class AdvancedDownloader:
                                       audio_format_id: Optional[str] = None,
                                       progress_callback: Optional[Callable] = None) -> str:
         """Download specific video frame and merge with best audio - crash-safe version"""
-        download_id = str(uuid.uuid4())
-        
         # If no audio format specified, use best audio
-        if audio_format_id:
-            format_selector = f"{video_format_id}+{audio_format_id}"
-        else:
-            format_selector = f"{video_format_id}+bestaudio"
-        
-        ydl_opts = self.get_base_options()
-        ydl_opts.update({
-            'format': format_selector,
-            'merge_output_format': 'mp4',
-            'prefer_ffmpeg': True,
-            'keepvideo': False,
-            'outtmpl': os.path.join(settings.DOWNLOAD_DIR, '%(title).100s.%(ext)s'),
-            'restrictfilenames': True,
-            'windowsfilenames': True,
-            # Memory and stability optimizations
-            'writeinfojson': False,
-            'writethumbnail': False,
-            'concurrent_fragment_downloads': 1,  # Single thread for stability
-            # Safe FFmpeg options
-            'postprocessor_args': {
-                'ffmpeg': [
-                    '-threads', '1',  # Single thread for frame downloads
-                    '-preset', 'ultrafast',  # Fastest preset for single frames
-                    '-avoid_negative_ts', 'make_zero',
-                    '-max_muxing_queue_size', '512',  # Smaller queue for frames
-                    '-movflags', '+faststart',
-                ]
-            },
-        })
-        ydl_opts['progress_hooks'] = [self.create_progress_hook(download_id, progress_callback)]
+        format_selector = f"{video_format_id}+{audio_format_id or 'bestaudio'}"
         
-        try:
-            self.active_downloads[download_id] = {
-                'status': DownloadStatus.DOWNLOADING,
-                'url': url,
-                'format': format_selector
-            }
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = await asyncio.get_event_loop().run_in_executor(
-                    None, lambda: ydl.extract_info(url, download=True)
-                )
-                
-                if not info:
-                    raise Exception("Download failed - no info returned")
-                
-                # Get the final merged filename
-                filename = ydl.prepare_filename(info)
-                base_name = os.path.splitext(filename)[0]
-                final_filename = f"{base_name}.mp4"
-                
-                # Check if merged file exists
-                if os.path.exists(final_filename):
-                    filename = final_filename
-                elif os.path.exists(filename):
-                    pass
-                else:
-                    raise Exception("Merged file not found after download")
-                
-                self.active_downloads[download_id]['status'] = DownloadStatus.COMPLETED
-                self.active_downloads[download_id]['filename'] = filename
-                
-                return filename
-                
-        except Exception as e:
-            logger.error(f"Frame download error: {e}")
-            self.active_downloads[download_id]['status'] = DownloadStatus.FAILED
-            self.active_downloads[download_id]['error'] = str(e)
-            raise Exception(f"Frame download failed: {str(e)}")
+        ydl_opts = self._build_merge_opts(format_selector, FRAME_EXTRA_OPTS)
+        return await self._run_download(
+            url, ydl_opts, progress_callback, "Frame download",
+            output_ext="mp4", missing_error="Merged file not found after download", format=format_selector
+        )
 
-    def _cleanup_processes(self):
-        """Clean up any hanging FFmpeg processes"""
+    def _available_memory_mb(self) -> Optional[int]:
+        """Available memory in MB, or None if it can't be determined"""
+        if psutil is not None:
+            return psutil.virtual_memory().available // (1024 * 1024)
         try:
-            # Clean up tracked processes
-            for download_id, process in list(self.ffmpeg_processes.items()):
-                if process.poll() is not None:  # Process has finished
-                    del self.ffmpeg_processes[download_id]
-                elif time.time() - process.creation_time > 3600:  # Process running > 1 hour
-                    logger.warning(f"Terminating long-running FFmpeg process for {download_id}")
-                    process.terminate()
-                    time.sleep(2)
-                    if process.poll() is None:
-                        process.kill()
-                    del self.ffmpeg_processes[download_id]
-            
-            # Force garbage collection
-            gc.collect()
-            
-        except Exception as e:
-            logger.error(f"Error cleaning up processes: {e}")
+            with open('/proc/meminfo') as meminfo:
+                for line in meminfo:
+                    if line.startswith('MemAvailable:'):
+                        return int(line.split()[1]) // 1024
+        except OSError:
+            pass
+        return None
     
     def _check_system_resources(self) -> bool:
         """Check if system has enough resources for download"""
         try:
-            # Check available memory (require at least 500MB free)
-            memory = os.popen('free -m').read() if os.name != 'nt' else None
-            if memory:
-                lines = memory.strip().split('\n')
-                if len(lines) > 1:
-                    available = int(lines[1].split()[6])  # Available memory
-                    if available < 500:  # Less than 500MB
-                        logger.warning(f"Low memory: {available}MB available")
-                        return False
+            # Check available memory without spawning a shell for `free`
+            available = self._available_memory_mb()
+            if available is not None and available < MIN_AVAILABLE_MEMORY_MB:
+                logger.warning(f"Low memory: {available}MB available")
+                return False
             
-            # Check active downloads count
-            active_count = sum(1 for d in self.active_downloads.values() 
-                             if d.get('status') == DownloadStatus.DOWNLOADING)
-            if active_count >= self.max_concurrent_downloads:
-                logger.warning(f"Too many active downloads: {active_count}")
+            # Refuse before yt-dlp starts writing into a full disk
+            free_disk = shutil.disk_usage(settings.DOWNLOAD_DIR).free // (1024 * 1024)
+            if free_disk < MIN_FREE_DISK_MB:
+                logger.warning(f"Low disk space: {free_disk}MB free in {settings.DOWNLOAD_DIR}")
                 return False
             
             return True
@@ -615,8 +769,6 @@ class AdvancedDownloader:
                                              sponsorblock_api: str = "https://sponsor.ajay.app",
                                              progress_callback: Optional[Callable] = None) -> str:
         """Download music with SponsorBlock integration to remove unwanted segments"""
-        download_id = str(uuid.uuid4())
-        
         if remove_categories is None:
             remove_categories = ["sponsor", "intro", "outro", "selfpromo", "preview", "interaction", "music_offtopic"]
         
@@ -652,96 +804,29 @@ class AdvancedDownloader:
             'windowsfilenames': True,
             **sponsorblock_opts  # Add SponsorBlock options
         })
-        ydl_opts['progress_hooks'] = [self.create_progress_hook(download_id, progress_callback)]
         
-        try:
-            # Check system resources before starting
-            if not self._check_system_resources():
-                raise Exception("Insufficient system resources for download")
-            
-            # Clean up any hanging processes
-            self._cleanup_processes()
-            
-            self.active_downloads[download_id] = {
-                'status': DownloadStatus.DOWNLOADING,
-                'url': url,
-                'type': 'music_sponsorblock',
-                'start_time': time.time()
-            }
-            
-            # Use timeout for the download operation
-            try:
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    info = await asyncio.wait_for(
-                        asyncio.get_event_loop().run_in_executor(
-                            None, lambda: ydl.extract_info(url, download=True)
-                        ),
-                        timeout=1800  # 30 minutes timeout
-                    )
-                    
-                    if not info:
-                        raise Exception("Download failed - no info returned")
-                    
-                    # Get the final processed filename
-                    filename = ydl.prepare_filename(info)
-                    base_name = os.path.splitext(filename)[0]
-                    final_filename = f"{base_name}.{audio_format}"
-                    
-                    # Check if processed file exists
-                    if os.path.exists(final_filename):
-                        filename = final_filename
-                    elif os.path.exists(filename):
-                        pass
-                    else:
-                        raise Exception("Processed music file not found after download")
-                    
-                    # Verify file is not corrupted
-                    if os.path.getsize(filename) < 1024:  # Less than 1KB
-                        raise Exception("Downloaded file appears to be corrupted (too small)")
-                    
-                    self.active_downloads[download_id]['status'] = DownloadStatus.COMPLETED
-                    self.active_downloads[download_id]['filename'] = filename
-                    
-                    # Clean up after successful download
-                    self._cleanup_processes()
-                    
-                    logger.info(f"SponsorBlock music download completed: {filename}")
-                    logger.info(f"Removed categories: {remove_categories}")
-                    if mark_categories:
-                        logger.info(f"Marked categories: {mark_categories}")
-                    
-                    return filename
-                    
-            except asyncio.TimeoutError:
-                raise Exception("Download timed out after 30 minutes")
-                
-        except Exception as e:
-            logger.error(f"SponsorBlock music download error: {e}")
-            self.active_downloads[download_id]['status'] = DownloadStatus.FAILED
-            self.active_downloads[download_id]['error'] = str(e)
-            
-            # Clean up on error
-            self._cleanup_processes()
-            
-            raise Exception(f"SponsorBlock music download failed: {str(e)}")
+        filename = await self._run_download(
+            url, ydl_opts, progress_callback, "SponsorBlock music download",
+            output_ext=audio_format, missing_error="Processed music file not found after download", min_size=1024,
+            timeout=1800, guarded=True, type='music_sponsorblock', start_time=time.time()
+        )
+        
+        logger.info(f"SponsorBlock music download completed: {filename}")
+        logger.info(f"Removed categories: {remove_categories}")
+        if mark_categories:
+            logger.info(f"Marked categories: {mark_categories}")
+        
+        return filename
     
     def cancel_download(self, download_id: str) -> bool:
         """Cancel active download and clean up resources"""
-        if download_id in self.active_downloads:
-            self.active_downloads[download_id]['status'] = DownloadStatus.CANCELLED
-            
-            # Clean up any associated FFmpeg process
-            if download_id in self.ffmpeg_processes:
-                try:
-                    process = self.ffmpeg_processes[download_id]
-                    process.terminate()
-                    time.sleep(1)
-                    if process.poll() is None:
-                        process.kill()
-                    del self.ffmpeg_processes[download_id]
-                except Exception as e:
-                    logger.error(f"Error terminating process for {download_id}: {e}")
-            
+        entry = self.active_downloads.get(download_id)
+        if entry is not None:
+            entry['status'] = DownloadStatus.CANCELLED
+            # Stops the yt-dlp thread at its next progress update
+            cancel_event = self._cancel_events.get(download_id)
+            if cancel_event is not None:
+                cancel_event.set()
             return True
         return False
 
@@ -5,10 +5,11 @@ Logging configuration
 import logging
 import logging.handlers
 import os
+import queue
 from core.config import settings
 
-def setup_logging():
-    """Setup application logging"""
+def setup_logging() -> logging.handlers.QueueListener:
+    """Setup application logging; handlers write from a listener thread"""
     
     # Create logs directory if it doesn't exist
     os.makedirs("logs", exist_ok=True)
@@ -25,7 +26,6 @@ def setup_logging():
     # Console handler
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
-    root_logger.addHandler(console_handler)
     
     # File handler with rotation
     file_handler = logging.handlers.RotatingFileHandler(
@@ -34,8 +34,18 @@ def setup_logging():
         backupCount=5
     )
     file_handler.setFormatter(formatter)
-    root_logger.addHandler(file_handler)
+    
+    # Request handlers only enqueue records; the listener thread does the
+    # console/file writes and log rotation off the event loop
+    log_queue = queue.SimpleQueue()
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(
+        log_queue, console_handler, file_handler, respect_handler_level=True
+    )
+    listener.start()
     
     # Suppress some noisy loggers
     logging.getLogger("urllib3").setLevel(logging.WARNING)
-    logging.getLogger("yt_dlp").setLevel(logging.WARNING)
\ No newline at end of file
+    logging.getLogger("yt_dlp").setLevel(logging.WARNING)
+    
+    return listener
@@ -4,6 +4,7 @@ Pydantic models for request/response schemas
 
 from pydantic import BaseModel, HttpUrl, Field
 from typing import List, Optional, Dict, Any, Literal
+from functools import cached_property
 from enum import Enum
 from datetime import datetime
 
@@ -33,6 +34,14 @@ class DownloadStatus(str, Enum):
 # Request Models
 class URLRequest(BaseModel):
     url: HttpUrl
+
+    @cached_property
+    def url_str(self) -> str:
+        """The request URL as a plain string, stringified once per request"""
+        return str(self.url)
+
+class BatchURLRequest(BaseModel):
+    urls: List[HttpUrl] = Field(..., min_length=1, max_length=200)
     
 class VideoDownloadRequest(BaseModel):
     url: HttpUrl
@@ -41,8 +50,7 @@ class VideoDownloadRequest(BaseModel):
     output_template: Optional[str] = None
     subtitle_langs: Optional[List[str]] = None
 
-class AudioDownloadRequest(BaseModel):
-    url: HttpUrl
+class AudioDownloadRequest(URLRequest):
     quality: Literal["best", "320", "256", "192", "128"] = "best"
     format: Literal["mp3", "aac", "flac", "opus", "wav"] = "mp3"
     output_template: Optional[str] = None
@@ -80,8 +88,7 @@ class MusicDownloadRequest(BaseModel):
     sponsorblock_categories: List[str] = ["sponsor", "intro", "outro", "selfpromo", "preview", "interaction"]
     output_template: Optional[str] = None
 
-class SponsorBlockMusicRequest(BaseModel):
-    url: HttpUrl
+class SponsorBlockMusicRequest(URLRequest):
     quality: Literal["best", "320", "256", "192", "128"] = "best"
     format: Literal["mp3", "aac", "flac", "opus", "wav"] = "mp3"
     remove_categories: List[str] = ["sponsor", "intro", "outro", "selfpromo", "preview", "interaction", "music_offtopic"]
@@ -0,0 +1,56 @@
+"""
+Bounded in-memory registries for download state
+"""
+
+import asyncio
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional, Tuple
+
+class BoundedDict(OrderedDict):
+    """Dict that keeps only the most recently inserted maxlen entries"""
+
+    def __init__(self, *args, maxlen: int = 1000, **kwargs):
+        self.maxlen = maxlen
+        super().__init__(*args, **kwargs)
+
+    def __setitem__(self, key: Hashable, value: Any):
+        super().__setitem__(key, value)
+        if len(self) > self.maxlen:
+            self.popitem(last=False)
+
+class DownloadRegistry:
+    """Progress objects keyed by download id, capped in size and expired once finished"""
+
+    def __init__(self, maxsize: int = 1024, finished_ttl: float = 600):
+        self.maxsize = maxsize
+        self.finished_ttl = finished_ttl
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def add(self, key: Hashable, value: Any):
+        """Register an entry, dropping the oldest ones beyond maxsize"""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return an entry, or None if unknown or already evicted"""
+        return self._entries.get(key)
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """Snapshot of the entries, safe to iterate across awaits"""
+        return list(self._entries.items())
+
+    def finish(self, key: Hashable):
+        """Keep a finished entry around for status polling, then evict it"""
+        asyncio.get_running_loop().call_later(self.finished_ttl, self.evict, key)
+
+    def evict(self, key: Hashable):
+        """Remove an entry if it is still present"""
+        self._entries.pop(key, None)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
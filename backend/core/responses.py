@@ -0,0 +1,42 @@
+"""
+Shared response helpers
+"""
+
+import hashlib
+from types import MappingProxyType
+from typing import Any, Mapping, Optional
+
+import orjson
+from fastapi import Request, Response
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header covers etag, using weak comparison as RFC 9110 requires"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    strong = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == strong for tag in if_none_match.split(","))
+
+class StaticJSON:
+    """JSON payload serialized once at import and served with an ETag"""
+
+    def __init__(self, payload: Mapping[str, Any], max_age: int = 86400, immutable: bool = False):
+        self.body = orjson.dumps(payload)
+        # Read-only view for Python callers that need the data, not the bytes
+        self.payload = MappingProxyType(payload)
+        self.etag = f'"{hashlib.blake2b(self.body, digest_size=8).hexdigest()}"'
+        cache_control = f"public, max-age={max_age}"
+        if immutable:
+            # Content never changes for a given ETag; browsers can skip revalidation
+            cache_control += ", immutable"
+        self.headers = {
+            "Cache-Control": cache_control,
+            "ETag": self.etag,
+        }
+
+    def response(self, request: Request) -> Response:
+        """Return the cached body, or 304 if the client already has it"""
+        if etag_matches(request.headers.get("if-none-match"), self.etag):
+            return Response(status_code=304, headers=self.headers)
+        return Response(content=self.body, media_type="application/json", headers=self.headers)
@@ -3,15 +3,19 @@ import os
 import subprocess
 import tempfile
 import shutil
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
 from Crypto.Cipher import AES
 from Crypto.Util.Padding import unpad
 import re
 import uuid
-from typing import Optional, Callable
+from typing import AsyncIterator, Optional, Callable
 import asyncio
 
+# #EXT-X-KEY attributes
+KEY_URI_PATTERN = re.compile(r'URI="([^"]+)"')
+KEY_IV_PATTERN = re.compile(r'IV=0x([0-9A-Fa-f]+)')
+
 # Headers
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
@@ -37,6 +41,24 @@ class M3U8Downloader:
         if self.progress_callback:
             self.progress_callback({"type": "log", "message": message})
 
+    async def _run_segments(self, worker: Callable, pairs, max_workers: int, *args) -> AsyncIterator:
+        """Run worker over (url, index) pairs in a thread pool, yielding (pair, result) as each finishes"""
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+
+        async def run(pair):
+            return pair, await loop.run_in_executor(executor, worker, pair, *args)
+
+        tasks = [asyncio.create_task(run(pair)) for pair in pairs]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Don't block the event loop waiting on segments nobody will use
+            for task in tasks:
+                task.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+
     def _parse_m3u8(self, m3u8_url: str):
         """Parse M3U8 playlist and extract segments and encryption info"""
         self._log(f"[*] Fetching playlist from {m3u8_url}")
@@ -92,8 +114,8 @@ class M3U8Downloader:
             if line.startswith("#EXT-X-KEY:"):
                 # Parse encryption key info
                 if "METHOD=AES-128" in line:
-                    key_match = re.search(r'URI="([^"]+)"', line)
-                    iv_match = re.search(r'IV=0x([0-9A-Fa-f]+)', line)
+                    key_match = KEY_URI_PATTERN.search(line)
+                    iv_match = KEY_IV_PATTERN.search(line)
 
                     if key_match:
                         key_url = key_match.group(1)
@@ -171,7 +193,7 @@ class M3U8Downloader:
             self._log(f"[*] Using temporary directory: {temp_dir}")
 
             # Parse M3U8 playlist
-            segments, encryption_key, encryption_iv = self._parse_m3u8(m3u8_url)
+            segments, encryption_key, encryption_iv = await asyncio.to_thread(self._parse_m3u8, m3u8_url)
 
             if not segments:
                 raise Exception("No segments found in M3U8 playlist")
@@ -181,30 +203,28 @@ class M3U8Downloader:
             results = []
             failed_segments = []
 
-            with ThreadPoolExecutor(max_workers=8) as executor:
-                # Create list of (url, index) tuples for proper ordering
-                url_index_pairs = [(url, i) for i, url in enumerate(segments)]
-                futures = {executor.submit(self._download_and_decrypt_segment, pair, encryption_key, encryption_iv, temp_dir): pair for pair in url_index_pairs}
-
-                completed = 0
-                for future in as_completed(futures):
-                    seg_file = future.result()
-                    completed += 1
-
-                    if self.progress_callback:
-                        self.progress_callback({
-                            "type": "progress",
-                            "current": completed,
-                            "total": len(segments),
-                            "percentage": (completed / len(segments)) * 100
-                        })
-
-                    if seg_file:
-                        results.append(seg_file)
-                    else:
-                        # Track failed segments for retry
-                        url, index = futures[future]
-                        failed_segments.append((url, index))
+            # Create list of (url, index) tuples for proper ordering
+            url_index_pairs = [(url, i) for i, url in enumerate(segments)]
+
+            completed = 0
+            async for pair, seg_file in self._run_segments(
+                self._download_and_decrypt_segment, url_index_pairs, 8, encryption_key, encryption_iv, temp_dir
+            ):
+                completed += 1
+
+                if self.progress_callback:
+                    self.progress_callback({
+                        "type": "progress",
+                        "current": completed,
+                        "total": len(segments),
+                        "percentage": (completed / len(segments)) * 100
+                    })
+
+                if seg_file:
+                    results.append(seg_file)
+                else:
+                    # Track failed segments for retry
+                    failed_segments.append(pair)
 
             self._log(f"[*] Successfully downloaded {len(results)} out of {len(segments)} segments")
             self._log(f"[*] Failed segments: {len(failed_segments)}")
@@ -273,13 +293,9 @@ class M3U8Downloader:
         retry_results = []
 
         # First retry with longer timeout
-        with ThreadPoolExecutor(max_workers=4) as executor:
-            retry_futures = {executor.submit(download_and_decrypt_segment_retry, pair, 30): pair for pair in failed_segments}
-
-            for future in as_completed(retry_futures):
-                seg_file = future.result()
-                if seg_file:
-                    retry_results.append(seg_file)
+        async for _, seg_file in self._run_segments(download_and_decrypt_segment_retry, failed_segments, 4, 30):
+            if seg_file:
+                retry_results.append(seg_file)
 
         self._log(f"[*] First retry recovered {len(retry_results)} segments")
 
@@ -288,13 +304,9 @@ class M3U8Downloader:
 
         if still_failed:
             self._log(f"[*] Second retry for {len(still_failed)} segments with 60s timeout...")
-            with ThreadPoolExecutor(max_workers=2) as executor:
-                retry_futures2 = {executor.submit(download_and_decrypt_segment_retry, pair, 60): pair for pair in still_failed}
-
-                for future in as_completed(retry_futures2):
-                    seg_file = future.result()
-                    if seg_file:
-                        retry_results.append(seg_file)
+            async for _, seg_file in self._run_segments(download_and_decrypt_segment_retry, still_failed, 2, 60):
+                if seg_file:
+                    retry_results.append(seg_file)
 
         self._log(f"[*] Total retry recovery: {len(retry_results)} segments")
         return retry_results
@@ -322,7 +334,7 @@ class M3U8Downloader:
         # Merge with ffmpeg
         self._log("[*] Merging segments into final MP4...")
         try:
-            result = subprocess.run([
+            result = await asyncio.to_thread(subprocess.run, [
                 "ffmpeg", "-f", "concat", "-safe", "0",
                 "-i", files_list_path, "-c", "copy", "-y", output_path
             ], capture_output=True, text=True, check=True)
@@ -337,7 +349,7 @@ class M3U8Downloader:
 
             alt_output = output_path.replace('.mp4', '_alt.mp4')
             try:
-                subprocess.run([
+                await asyncio.to_thread(subprocess.run, [
                     "ffmpeg", "-i", f"concat:{'|'.join(results)}",
                     "-c", "copy", "-y", alt_output
                 ], check=True)
@@ -5,30 +5,44 @@ Built with FastAPI and yt-dlp
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
+import asyncio
+import logging
 import uvicorn
 
-from api.routes import video, audio, playlist, live, formats, queue, m3u8, browser_download
-from core.config import settings
+from api.routes import video, audio, playlist, live, formats, queue, m3u8, browser_download, downloads
+from core.config import settings, server_loop_options, ensure_directories
 from core.database import init_db
 from core.logger import setup_logging
 from core.downloader import downloader
 
+logger = logging.getLogger(__name__)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    setup_logging()
+    ensure_directories()
+    log_listener = setup_logging()
+    # Confirms whether uvloop is active, whichever way the server was launched
+    logger.info("Event loop: %s", type(asyncio.get_running_loop()).__module__)
     await init_db()
+    await browser_download.get_session()
+    # Runs in the background so startup doesn't wait on YouTube
+    warmup_task = asyncio.create_task(downloader.warm_up())
     yield
     # Shutdown
-    pass
+    warmup_task.cancel()
+    await browser_download.close_session()
+    downloader.shutdown()
+    log_listener.stop()
 
 app = FastAPI(
     title="Advanced YouTube Downloader",
     description="Multi-mode downloader with yt-dlp integration",
     version="2.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -40,8 +54,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount static files
-app.mount("/downloads", StaticFiles(directory="downloads"), name="downloads")
+# Serve downloaded files (Range-aware, so media players can seek)
+app.include_router(downloads.router, tags=["downloads"])
 
 # Include routers
 app.include_router(video.router, prefix="/api/video", tags=["video"])
@@ -101,11 +115,8 @@ async def system_status():
 
 @app.post("/system/cleanup")
 async def cleanup_system():
-    """Clean up system resources and hanging processes"""
+    """Clean up system resources"""
     try:
-        # Clean up downloader processes
-        downloader._cleanup_processes()
-        
         # Force garbage collection
         import gc
         gc.collect()
@@ -120,5 +131,6 @@ if __name__ == "__main__":
         host=settings.HOST,
         port=settings.PORT,
         reload=settings.DEBUG,
-        log_level="info"
+        log_level="info",
+        **server_loop_options()
     )
\ No newline at end of file
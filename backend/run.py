@@ -4,7 +4,7 @@ Development server runner
 """
 
 import uvicorn
-from core.config import settings
+from core.config import settings, server_loop_options
 
 if __name__ == "__main__":
     uvicorn.run(
@@ -12,5 +12,6 @@ if __name__ == "__main__":
         host=settings.HOST,
         port=settings.PORT,
         reload=settings.DEBUG,
-        log_level="info"
+        log_level="info",
+        **server_loop_options()
     )
\ No newline at end of file
@@ -0,0 +1,59 @@
+"""
+Cached yt-dlp metadata lookups shared by the API routes
+"""
+
+import asyncio
+
+from core.cache import AsyncTTLCache, normalize_url
+from core.downloader import downloader
+from core.models import PlaylistInfo, VideoInfo
+
+# Extraction is idempotent for minutes; live status flips, so it gets a short TTL
+video_info_cache = AsyncTTLCache(maxsize=2048, ttl=600)
+live_info_cache = AsyncTTLCache(maxsize=1024, ttl=30)
+playlist_info_cache = AsyncTTLCache(maxsize=256, ttl=300)
+
+async def get_video_info(url: str) -> VideoInfo:
+    """Get video info from cache or yt-dlp, keyed on the normalized URL"""
+    return await video_info_cache.get_or_fetch(normalize_url(url), lambda: downloader.get_video_info(url))
+
+async def get_live_info(url: str) -> VideoInfo:
+    """Get video info for live status checks, cached only briefly and without frame details"""
+    return await live_info_cache.get_or_fetch(normalize_url(url), lambda: downloader.get_video_info(url, include_frames=False))
+
+async def get_playlist_info(url: str) -> PlaylistInfo:
+    """Get playlist info from cache or yt-dlp, keyed on the normalized URL"""
+    return await playlist_info_cache.get_or_fetch(normalize_url(url), lambda: downloader.get_playlist_info(url))
+
+async def get_playlist_info_full(url: str, concurrency: int = 8) -> PlaylistInfo:
+    """Get playlist info with each flat entry enriched from its full video info, fetched concurrently"""
+    playlist = await get_playlist_info(url)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(video: dict) -> VideoInfo:
+        async with semaphore:
+            return await get_video_info(f"https://www.youtube.com/watch?v={video['id']}")
+
+    results = await asyncio.gather(*(fetch(video) for video in playlist.videos), return_exceptions=True)
+
+    videos = []
+    for video, info in zip(playlist.videos, results):
+        if isinstance(info, Exception):
+            # Unavailable or private entries keep their flat metadata
+            videos.append(video)
+            continue
+        videos.append({
+            **video,
+            'title': info.title,
+            'duration': info.duration,
+            'uploader': info.uploader,
+            'upload_date': info.upload_date,
+            'view_count': info.view_count,
+            'thumbnail': info.thumbnail,
+        })
+
+    return playlist.model_copy(update={'videos': videos})
+
+def clear_metadata_caches() -> int:
+    """Drop every cached lookup and return how many entries were removed"""
+    return video_info_cache.clear() + live_info_cache.clear() + playlist_info_cache.clear()
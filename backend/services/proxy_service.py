@@ -14,6 +14,22 @@ import random
 
 logger = logging.getLogger(__name__)
 
+# Patterns compiled once; these run on every proxied request
+VIDEO_ID_PATTERNS = [
+    re.compile(r'(?:youtube\.com/watch\?v=|youtu\.be/|youtube\.com/embed/)([^&\n?#]+)'),
+    re.compile(r'youtube\.com/v/([^&\n?#]+)'),
+    re.compile(r'youtube\.com/watch\?.*v=([^&\n?#]+)')
+]
+TITLE_PATTERN = re.compile(r'<title>([^<]+)</title>')
+META_PATTERNS = {
+    'title': re.compile(r'<meta property="og:title" content="([^"]+)"'),
+    'description': re.compile(r'<meta property="og:description" content="([^"]+)"'),
+    'thumbnail': re.compile(r'<meta property="og:image" content="([^"]+)"'),
+    'duration': re.compile(r'<meta property="video:duration" content="([^"]+)"'),
+    'author': re.compile(r'<meta name="author" content="([^"]+)"')
+}
+JSON_LD_PATTERN = re.compile(r'<script type="application/ld\+json">([^<]+)</script>')
+
 class YouTubeProxyService:
     def __init__(self):
         self.session = None
@@ -39,14 +55,8 @@ class YouTubeProxyService:
     
     def extract_video_id(self, url: str) -> Optional[str]:
         """Extract YouTube video ID from URL"""
-        patterns = [
-            r'(?:youtube\.com/watch\?v=|youtu\.be/|youtube\.com/embed/)([^&\n?#]+)',
-            r'youtube\.com/v/([^&\n?#]+)',
-            r'youtube\.com/watch\?.*v=([^&\n?#]+)'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, url)
+        for pattern in VIDEO_ID_PATTERNS:
+            match = pattern.search(url)
             if match:
                 return match.group(1)
         return None
@@ -126,27 +136,19 @@ class YouTubeProxyService:
         
         try:
             # Extract title
-            title_match = re.search(r'<title>([^<]+)</title>', html)
+            title_match = TITLE_PATTERN.search(html)
             if title_match:
                 title = title_match.group(1).replace(' - YouTube', '')
                 metadata['title'] = title
             
             # Extract from meta tags
-            meta_patterns = {
-                'title': r'<meta property="og:title" content="([^"]+)"',
-                'description': r'<meta property="og:description" content="([^"]+)"',
-                'thumbnail': r'<meta property="og:image" content="([^"]+)"',
-                'duration': r'<meta property="video:duration" content="([^"]+)"',
-                'author': r'<meta name="author" content="([^"]+)"'
-            }
-            
-            for key, pattern in meta_patterns.items():
-                match = re.search(pattern, html)
+            for key, pattern in META_PATTERNS.items():
+                match = pattern.search(html)
                 if match:
                     metadata[key] = match.group(1)
             
             # Extract JSON-LD data
-            json_ld_match = re.search(r'<script type="application/ld\+json">([^<]+)</script>', html)
+            json_ld_match = JSON_LD_PATTERN.search(html)
             if json_ld_match:
                 try:
                     json_data = json.loads(json_ld_match.group(1))
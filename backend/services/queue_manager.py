@@ -3,57 +3,125 @@ Download queue management service
 """
 
 import asyncio
+import heapq
+import itertools
 import uuid
-from typing import Dict, List, Optional
+from dataclasses import dataclass, field
+from functools import singledispatch
+from typing import Any, Callable, ClassVar, Dict, List, Optional, Tuple
 from datetime import datetime
 import logging
 
 from core.models import DownloadStatus, DownloadProgress
 from core.config import settings
+from core.registry import BoundedDict
 from core.downloader import downloader
 
 logger = logging.getLogger(__name__)
 
+# Queued download jobs. The job class decides how the download runs;
+# `kind` is only a label reported by the queue API.
+@dataclass(frozen=True, slots=True)
+class DownloadJob:
+    url: str
+    options: Dict[str, Any] = field(default_factory=dict)
+    priority: int = 0
+    batch_id: Optional[str] = None
+    batch_index: Optional[int] = None
+
+    kind: ClassVar[str] = "video"
+
+@dataclass(frozen=True, slots=True)
+class MergeVideoJob(DownloadJob):
+    kind: ClassVar[str] = "video_merge"
+
+@dataclass(frozen=True, slots=True)
+class AudioJob(DownloadJob):
+    kind: ClassVar[str] = "audio"
+
+@dataclass(frozen=True, slots=True)
+class PlaylistJob(DownloadJob):
+    kind: ClassVar[str] = "playlist"
+
+@dataclass(frozen=True, slots=True)
+class LiveJob(DownloadJob):
+    kind: ClassVar[str] = "live"
+
+@singledispatch
+async def run_job(job: DownloadJob, progress_callback: Optional[Callable] = None) -> str:
+    """Run a yt-dlp download with the job's options"""
+    return await downloader.download_video(job.url, job.options, progress_callback)
+
+@run_job.register
+async def _run_merge_job(job: MergeVideoJob, progress_callback: Optional[Callable] = None) -> str:
+    """Download separate video+audio streams and merge them"""
+    quality = job.options.get('format', 'best')
+    return await downloader.download_video_with_merge(job.url, quality, progress_callback)
+
 class QueueManager:
     def __init__(self):
-        self.queue: List[Dict] = []
+        # Heap of (-priority, sequence, item): highest priority first, FIFO within a priority
+        self.queue: List[Tuple[int, int, Dict]] = []
+        self._sequence = itertools.count()
         self.active_downloads: Dict[str, Dict] = {}
-        self.completed_downloads: Dict[str, Dict] = {}
-        self.failed_downloads: Dict[str, Dict] = {}
+        # Finished history keeps only the most recent entries
+        self.completed_downloads: Dict[str, Dict] = BoundedDict(maxlen=1000)
+        self.failed_downloads: Dict[str, Dict] = BoundedDict(maxlen=1000)
+        # download_id -> queue item, so status lookups don't scan the queue
+        self.pending: Dict[str, Dict] = {}
+        # Bumped on every state change, lets readers reuse cached snapshots
+        self.version = 0
         self.max_concurrent = settings.MAX_CONCURRENT_DOWNLOADS
         self.is_processing = False
         
-    async def add_to_queue(self, download_request: Dict) -> str:
-        """Add download request to queue"""
+    def _new_queue_item(self, job: DownloadJob) -> Dict:
+        """Build the pending queue entry for a job"""
         download_id = str(uuid.uuid4())
-        
         queue_item = {
             'download_id': download_id,
-            'request': download_request,
+            'job': job,
             'status': DownloadStatus.PENDING,
             'created_at': datetime.now(),
-            'priority': download_request.get('priority', 0)
+            'priority': job.priority
         }
+        self.pending[download_id] = queue_item
+        return queue_item
+    
+    def _ensure_processing(self):
+        """Start the queue worker if it is not already running"""
+        if not self.is_processing:
+            asyncio.create_task(self.process_queue())
+    
+    async def add_to_queue(self, job: DownloadJob) -> str:
+        """Add download job to queue"""
+        queue_item = self._new_queue_item(job)
+        download_id = queue_item['download_id']
         
-        # Insert based on priority (higher priority first)
-        inserted = False
-        for i, item in enumerate(self.queue):
-            if queue_item['priority'] > item['priority']:
-                self.queue.insert(i, queue_item)
-                inserted = True
-                break
-        
-        if not inserted:
-            self.queue.append(queue_item)
+        heapq.heappush(self.queue, (-job.priority, next(self._sequence), queue_item))
+        self.version += 1
         
         logger.info(f"Added download {download_id} to queue")
         
         # Start processing if not already running
-        if not self.is_processing:
-            asyncio.create_task(self.process_queue())
+        self._ensure_processing()
         
         return download_id
     
+    async def add_many(self, jobs: List[DownloadJob]) -> List[str]:
+        """Add several jobs at once, re-heapifying once instead of pushing each"""
+        queue_items = [self._new_queue_item(job) for job in jobs]
+        self.queue.extend(
+            (-item['priority'], next(self._sequence), item) for item in queue_items
+        )
+        heapq.heapify(self.queue)
+        self.version += 1
+        
+        logger.info(f"Added {len(queue_items)} downloads to queue")
+        
+        self._ensure_processing()
+        
+        return [item['download_id'] for item in queue_items]
+    
     async def process_queue(self):
         """Process download queue"""
         if self.is_processing:
@@ -68,19 +136,21 @@ class QueueManager:
                 while (len(self.active_downloads) < self.max_concurrent and 
                        self.queue):
                     
-                    queue_item = self.queue.pop(0)
+                    _, _, queue_item = heapq.heappop(self.queue)
                     download_id = queue_item['download_id']
+                    self.pending.pop(download_id, None)
                     
                     # Start download
                     task = asyncio.create_task(
-                        self._process_download(download_id, queue_item['request'])
+                        self._process_download(download_id, queue_item['job'])
                     )
                     
                     self.active_downloads[download_id] = {
                         'task': task,
-                        'request': queue_item['request'],
+                        'job': queue_item['job'],
                         'started_at': datetime.now()
                     }
+                    self.version += 1
                     
                     logger.info(f"Started download {download_id}")
                 
@@ -108,40 +178,21 @@ class QueueManager:
                             'failed_at': datetime.now()
                         }
                         logger.error(f"Download {download_id} failed: {e}")
+                    self.version += 1
         
         finally:
             self.is_processing = False
             logger.info("Queue processing stopped")
     
-    async def _process_download(self, download_id: str, request: Dict):
+    async def _process_download(self, download_id: str, job: DownloadJob):
         """Process individual download"""
         try:
-            download_type = request.get('type')
-            url = request.get('url')
-            options = request.get('options', {})
-            
             # Create progress callback
             def progress_callback(progress_data):
                 # You can emit this to WebSocket clients or store in database
                 logger.debug(f"Download {download_id} progress: {progress_data['progress']:.1f}%")
             
-            # Perform download based on type
-            if download_type == 'video':
-                filename = await downloader.download_video(url, options, progress_callback)
-            elif download_type == 'video_merge':
-                # Use the new merge method for high-quality video downloads
-                quality = options.get('format', 'best')
-                filename = await downloader.download_video_with_merge(url, quality, progress_callback)
-            elif download_type == 'audio':
-                filename = await downloader.download_video(url, options, progress_callback)
-            elif download_type == 'playlist_video':
-                filename = await downloader.download_video(url, options, progress_callback)
-            elif download_type == 'playlist_audio':
-                filename = await downloader.download_video(url, options, progress_callback)
-            elif download_type == 'live':
-                filename = await downloader.download_video(url, options, progress_callback)
-            else:
-                raise ValueError(f"Unknown download type: {download_type}")
+            filename = await run_job(job, progress_callback)
             
             return {
                 'download_id': download_id,
@@ -189,25 +240,29 @@ class QueueManager:
             }
         
         # Check queue
-        for item in self.queue:
-            if item['download_id'] == download_id:
-                return {
-                    'status': DownloadStatus.PENDING,
-                    'created_at': item['created_at']
-                }
+        item = self.pending.get(download_id)
+        if item is not None:
+            return {
+                'status': DownloadStatus.PENDING,
+                'created_at': item['created_at']
+            }
         
         return None
     
     def cancel_download(self, download_id: str) -> bool:
         """Cancel download"""
         # Remove from queue
-        self.queue = [item for item in self.queue if item['download_id'] != download_id]
+        if self.pending.pop(download_id, None) is not None:
+            self.queue = [entry for entry in self.queue if entry[2]['download_id'] != download_id]
+            heapq.heapify(self.queue)
+            self.version += 1
         
         # Cancel active download
         if download_id in self.active_downloads:
             task = self.active_downloads[download_id]['task']
             task.cancel()
             self.active_downloads.pop(download_id)
+            self.version += 1
             return True
         
         return False
@@ -42,7 +42,7 @@ pip install --upgrade pip
 echo "Installing core dependencies..."
 if ! pip install -r requirements-simple.txt; then
     echo "⚠️  Some packages failed to install. Trying individual installation..."
-    pip install fastapi uvicorn[standard] yt-dlp pydantic sqlalchemy aiofiles python-multipart sse-starlette httpx
+    pip install fastapi uvicorn[standard] yt-dlp pydantic pydantic-settings sqlalchemy aiofiles python-multipart sse-starlette httpx aiohttp orjson
     echo "⚠️  Skipping Pillow and ffmpeg-python for now. You can install them manually if needed."
 fi
 